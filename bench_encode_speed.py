@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image
+
+import image_mutator_local as mut
+
+
+def run_profile(img, gens, speed, seeds, out_dir):
+    mut.set_encode_speed(speed)
+    rows = []
+    for name, fn, ext in gens:
+        elapsed = 0.0
+        size = 0
+        errors = 0
+        for seed in seeds:
+            outp = os.path.join(out_dir, f"{speed}_{name}_{seed}.{ext}")
+            t0 = time.perf_counter()
+            try:
+                fn(img, outp, random.Random(seed))
+            except Exception:
+                errors += 1
+                continue
+            elapsed += time.perf_counter() - t0
+            size += os.path.getsize(outp)
+            os.remove(outp)
+        rows.append((name, elapsed, size, errors))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time and size every generator under each --encode-speed profile")
+    ap.add_argument("--input", required=True, help="Seed image path used for derived variants")
+    ap.add_argument("--profile", default="mixed", help="Generator profile passed to build_generators")
+    ap.add_argument("--formats", nargs="*", default=["png", "jpg"])
+    ap.add_argument("--speeds", nargs="*", default=sorted(mut.ENCODE_SPEEDS))
+    ap.add_argument("--seeds", type=int, nargs="*", default=[1, 2, 3])
+    args = ap.parse_args()
+
+    img = Image.open(args.input)
+    img.load()
+    gens = mut.build_generators(set(args.formats), args.profile)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for speed in args.speeds:
+            results[speed] = run_profile(img, gens, speed, args.seeds, tmp)
+
+    base = "default" if "default" in results else args.speeds[0]
+    print(f"{'generator':34s}" + "".join(f"{s:>22s}" for s in args.speeds))
+    for i, (name, _fn, _ext) in enumerate(gens):
+        cells = []
+        for speed in args.speeds:
+            _n, elapsed, size, errors = results[speed][i]
+            cells.append(f"{elapsed:7.3f}s {size / 1024:9.1f}K{'!' if errors else ' '}  ")
+        print(f"{name:34s}" + "".join(f"{c:>22s}" for c in cells))
+
+    print()
+    base_t = sum(r[1] for r in results[base]) or 1e-9
+    base_b = sum(r[2] for r in results[base]) or 1
+    for speed in args.speeds:
+        t = sum(r[1] for r in results[speed])
+        b = sum(r[2] for r in results[speed])
+        print(f"{speed:8s} total {t:8.3f}s ({t / base_t:5.2f}x time)  {b / 1024:10.1f}K ({b / base_b:5.2f}x size)")
+
+
+if __name__ == "__main__":
+    main()
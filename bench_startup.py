@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def timed(cmd, repeat, cwd):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        runs.append(time.perf_counter() - t0)
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(cmd)} failed: {proc.stderr.decode(errors='replace').strip()[-300:]}")
+    return min(runs), statistics.median(runs)
+
+
+def tasks(tmp, src):
+    # Small enough that interpreter start-up and imports dominate.
+    pack = os.path.join(tmp, "tiny.json")
+    with open(pack, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "name": "tiny",
+                "files": [
+                    {"file": "a.jpg", "generator": "jpg_exif_orient", "seed": 1},
+                    {"file": "b.jpg", "generator": "jpg_prog_gray", "seed": 2},
+                ],
+            },
+            f,
+        )
+    return [
+        ("harden", "harden_image_intake_example.py", [src, os.path.join(tmp, "clean.jpg")]),
+        ("build_pack tiny", "build_pack.py", [pack, "--input", src, "--out-root", tmp, "--workers", "1"]),
+        ("build_pack --help", "build_pack.py", ["--help"]),
+    ]
+
+
+def wait_for(path, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit("warm daemon did not start")
+        time.sleep(0.05)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold-start vs warm-daemon wall time of short script runs")
+    ap.add_argument("--repeat", type=int, default=10, help="Runs per command; min and median are shown")
+    ap.add_argument("--no-warm", action="store_true", help="Skip the warm_daemon.py runs")
+    args = ap.parse_args()
+
+    py = sys.executable
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "src.jpg")
+        Image.linear_gradient("L").convert("RGB").resize((96, 64)).save(src)
+        rows.append(("python -c pass", timed([py, "-c", "pass"], args.repeat, tmp)))
+        rows.append(
+            (
+                "eager imports",
+                timed([py, "-c", "import numpy; from PIL import Image; Image.init()"], args.repeat, tmp),
+            )
+        )
+        todo = tasks(tmp, src)
+        for label, script, argv in todo:
+            rows.append((f"cold {label}", timed([py, os.path.join(HERE, script)] + argv, args.repeat, tmp)))
+
+        if not args.no_warm:
+            sock = os.path.join(tmp, "warm.sock")
+            daemon = subprocess.Popen(
+                [py, os.path.join(HERE, "warm_daemon.py"), "--socket", sock, "serve"], stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_for(sock, daemon)
+                client = [py, os.path.join(HERE, "warm_daemon.py"), "--socket", sock, "run"]
+                for label, script, argv in todo:
+                    rows.append((f"warm {label}", timed(client + [script] + argv, args.repeat, tmp)))
+            finally:
+                daemon.terminate()
+                daemon.wait()
+
+    print(f"{'command':28s} {'min':>9s} {'median':>9s}")
+    for label, (best, med) in rows:
+        print(f"{label:28s} {best * 1000:7.1f}ms {med * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
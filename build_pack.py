@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+
+from PIL import Image
+
+import image_mutator_local as mut
+
+mp = mut.lazy_import("multiprocessing")
+
+
+PACK_DEFS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pack_defs")
+
+# Per-worker state, filled by init_worker so each process decodes the source once.
+_source = None
+_registry = None
+
+
+def load_pack_file(path):
+    """Return the list of pack dicts defined in a .json or .toml file.
+
+    A file holds either one pack ({"name", "out", "files": [...]}) or several
+    under a top-level "packs" list. Each file entry is {"file", "generator", "seed"}.
+    """
+    if path.endswith(".toml"):
+        # Imported here: most runs only read JSON definitions.
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise SystemExit("TOML pack definitions need Python 3.11+ or the 'tomli' package.")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    packs = data["packs"] if "packs" in data else [data]
+    for pack in packs:
+        pack.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+        pack.setdefault("out", "./" + pack["name"])
+    return packs
+
+
+def init_worker(source, encode_speed):
+    # source is a path (decode here) or a mut.publish_source handle (map the parent's copy).
+    global _source, _registry
+    mut.set_encode_speed(encode_speed)
+    _source = mut.CachedSource(Image.open(source)) if isinstance(source, str) else mut.SharedSource(source)
+    _registry = mut.generator_registry()
+
+
+def run_job(job):
+    pack_name, outp, generator, seed = job
+    fn, _ext = _registry[generator]
+    try:
+        fn(_source, outp, random.Random(seed))
+        return pack_name, outp, None
+    except Exception as e:
+        return pack_name, outp, str(e)
+
+
+def plan_jobs(packs, seed_offset=0, out_root=None):
+    registry = mut.generator_registry()
+    jobs = []
+    for pack in packs:
+        out = os.path.join(out_root, pack["name"]) if out_root else pack["out"]
+        mut.ensure_dir(out)
+        for entry in pack["files"]:
+            if entry["generator"] not in registry:
+                raise SystemExit(f"{pack['name']}: unknown generator {entry['generator']!r}")
+            jobs.append((pack["name"], os.path.join(out, entry["file"]), entry["generator"], entry["seed"] + seed_offset))
+    return jobs
+
+
+def build_packs(packs, source_path, seed_offset=0, out_root=None, workers=1, encode_speed="default", budget=None):
+    jobs = plan_jobs(packs, seed_offset, out_root)
+    counts = {pack["name"]: [0, 0] for pack in packs}
+    with Image.open(source_path) as im:
+        src_size = im.size
+    src_px = src_size[0] * src_size[1]
+    workers = mut.budget_workers(workers, budget, src_px, shared=True)
+    shm = None
+    lost = []
+    if workers <= 1:
+        init_worker(source_path, encode_speed)
+        results = map(run_job, jobs)
+        pool = None
+    else:
+        # Decode once here; every worker maps the same pixels.
+        with Image.open(source_path) as im:
+            shm, handle = mut.publish_source(im)
+        pool = mp.Pool(workers, initializer=init_worker, initargs=(handle, encode_speed))
+        if budget is not None:
+            registry = mut.generator_registry()
+            costs = [mut.estimate_peak_bytes(registry[gen][0], src_size) for _p, _o, gen, _s in jobs]
+            job_budget = budget - mut.baseline_bytes(workers, src_px, shared=True)
+            results = mut.run_budgeted(
+                pool, run_job, jobs, costs, max(0, job_budget), workers, lambda job, e: (job[0], job[1], e), lost
+            )
+        else:
+            results = pool.imap_unordered(run_job, jobs)
+    try:
+        for pack_name, outp, err in results:
+            if err is None:
+                print("OK ", outp)
+                counts[pack_name][0] += 1
+            else:
+                print("ERR", outp, err)
+                counts[pack_name][1] += 1
+    finally:
+        if pool is not None:
+            mut.shutdown_pool(pool, lost)
+        if shm is not None:
+            mut.release_source(shm)
+    for name, (ok, err) in counts.items():
+        print(f"Done {name}: {ok} ok, {err} err")
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build one or more packs from JSON/TOML pack definitions")
+    ap.add_argument("defs", nargs="+", help="Pack definition files (.json or .toml)")
+    ap.add_argument("--input", required=True, help="Seed image path used for derived variants")
+    ap.add_argument("--out-root", help="Write each pack to <out-root>/<name> instead of its own 'out'")
+    ap.add_argument("--seed-offset", type=int, default=0, help="Optional offset applied to per-file seeds")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--encode-speed", choices=sorted(mut.ENCODE_SPEEDS), default="default")
+    ap.add_argument("--memory-budget", help="Cap on estimated peak memory across workers, e.g. 4G or 'auto'")
+    args = ap.parse_args()
+
+    packs = []
+    for path in args.defs:
+        packs += load_pack_file(path)
+    budget = mut.parse_size(args.memory_budget) if args.memory_budget else None
+    build_packs(packs, args.input, args.seed_offset, args.out_root, args.workers, args.encode_speed, budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+
+import numpy as np
+import PIL
+from PIL import Image, ImageSequence
+
+import build_pack
+import image_mutator_local as mut
+
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "outputs.json")
+GOLDEN_SEEDS = (11, 12)
+GOLDEN_PACKS = ("best20.json", "best24.json")
+
+_source = None
+
+
+def synthetic_source():
+    # Fixed 640x480 RGB seed so golden hashes do not depend on anyone's photo.
+    x = np.arange(640, dtype=np.uint16)
+    y = np.arange(480, dtype=np.uint16)[:, None]
+    rgb = np.empty((480, 640, 3), dtype=np.uint8)
+    rgb[..., 0] = mut.low_byte(x * 3 + y)
+    rgb[..., 1] = mut.low_byte((x ^ y) * 5)
+    rgb[..., 2] = mut.low_byte(np.multiply(x, y) >> 7)
+    return Image.fromarray(rgb, "RGB")
+
+
+def golden_cases():
+    """(label, generator, seed) for every distinct generator plus the curated packs."""
+    cases = []
+    seen = set()
+    for name, (fn, _ext) in mut.generator_registry().items():
+        if fn in seen:
+            continue
+        seen.add(fn)
+        for seed in GOLDEN_SEEDS:
+            cases.append((f"{name}@{seed}", name, seed))
+    for pack_file in GOLDEN_PACKS:
+        for pack in build_pack.load_pack_file(os.path.join(build_pack.PACK_DEFS_DIR, pack_file)):
+            for entry in pack["files"]:
+                cases.append((f"{pack['name']}/{entry['file']}", entry["generator"], entry["seed"]))
+    return cases
+
+
+def pixel_digest(data):
+    # Hash of every decoded frame (mode, size, raw pixels): stable across encoder settings.
+    h = hashlib.sha256()
+    with Image.open(io.BytesIO(data)) as im:
+        for frame in ImageSequence.Iterator(im):
+            frame.load()
+            h.update(f"{frame.mode}{frame.size}".encode("ascii"))
+            h.update(frame.tobytes())
+    return h.hexdigest()
+
+
+def open_source(source_path):
+    return Image.open(source_path) if source_path else synthetic_source()
+
+
+def init_worker(handle):
+    global _source
+    _source = mut.SharedSource(handle)
+
+
+def run_case(job):
+    label, generator, seed, speed = job
+    mut.set_encode_speed(speed)
+    fn, _ext = mut.generator_registry()[generator]
+    buf = io.BytesIO()
+    try:
+        fn(_source, buf, random.Random(seed))
+    except Exception as e:
+        return {"case": label, "generator": generator, "speed": speed, "error": type(e).__name__}
+    data = buf.getvalue()
+    return {
+        "case": label,
+        "generator": generator,
+        "speed": speed,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "pixels": pixel_digest(data),
+    }
+
+
+def run_all(source_path, speeds, workers):
+    jobs = [(label, gen, seed, speed) for speed in speeds for label, gen, seed in golden_cases()]
+    with open_source(source_path) as img:
+        shm, handle = mut.publish_source(img)
+    try:
+        with mp.Pool(workers, initializer=init_worker, initargs=(handle,)) as pool:
+            return pool.map(run_case, jobs, chunksize=4)
+    finally:
+        mut.release_source(shm)
+
+
+def source_digest(source_path):
+    img = open_source(source_path)
+    img.load()
+    return hashlib.sha256(img.tobytes()).hexdigest()
+
+
+def environment():
+    return {"pillow": PIL.__version__, "numpy": np.__version__, "python": sys.version.split()[0]}
+
+
+def record(args):
+    results = run_all(args.input, args.speeds, args.workers)
+    golden = {
+        "source": source_digest(args.input),
+        "environment": environment(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.golden)), exist_ok=True)
+    with open(args.golden, "w", encoding="utf-8") as f:
+        json.dump(golden, f, indent=1)
+        f.write("\n")
+    print(f"Recorded {len(results)} outputs -> {args.golden}")
+
+
+def verify(args):
+    with open(args.golden, encoding="utf-8") as f:
+        golden = json.load(f)
+    if golden["source"] != source_digest(args.input):
+        raise SystemExit("Source image differs from the one the golden file was recorded with.")
+    env = environment()
+    if golden["environment"] != env:
+        print("NOTE environment differs from recording:", golden["environment"], "now", env)
+        print("     encoder-only differences are expected; content differences are not.")
+
+    expected = {(r["case"], r["speed"]): r for r in golden["results"]}
+    speeds = sorted({r["speed"] for r in golden["results"]})
+    results = run_all(args.input, speeds, args.workers)
+
+    content = []
+    encoder = []
+    unrecorded = []
+    for r in results:
+        want = expected.get((r["case"], r["speed"]))
+        if want is None:
+            # A generator or pack entry added since the last record: nothing guards it yet.
+            unrecorded.append(r)
+            continue
+        if want.get("error") or r.get("error"):
+            if want.get("error") != r.get("error"):
+                content.append((r, want))
+        elif want["pixels"] != r["pixels"]:
+            content.append((r, want))
+        elif want["sha256"] != r["sha256"]:
+            encoder.append((r, want))
+    missing = set(expected) - {(r["case"], r["speed"]) for r in results}
+
+    for kind, rows in (("CONTENT", content), ("ENCODER", encoder)):
+        for r, want in rows:
+            print(f"{kind} {r['speed']:8s} {r['case']}")
+    for case, speed in sorted(missing):
+        print(f"MISSING {speed:8s} {case}")
+    for r in unrecorded:
+        print(f"UNRECORDED {r['speed']:8s} {r['case']}")
+    if content:
+        r, want = content[0]
+        print(f"First content divergence: generator {r['generator']} ({r['case']}, encode speed {r['speed']})")
+    elif encoder:
+        r, want = encoder[0]
+        print(f"First encoder-only divergence: generator {r['generator']} ({r['case']}, encode speed {r['speed']})")
+    print(
+        f"Done: {len(results)} checked, {len(content)} content, {len(encoder)} encoder-only, {len(missing)} missing, "
+        f"{len(unrecorded)} unrecorded"
+    )
+    if content or missing or (encoder and not args.allow_encoder_drift) or (unrecorded and not args.allow_unrecorded):
+        raise SystemExit(1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Record or verify SHA-256 of generator outputs for fixed seeds")
+    ap.add_argument("command", choices=["record", "verify"])
+    ap.add_argument("--golden", default=GOLDEN_PATH, help="Golden hash file")
+    ap.add_argument("--input", help="Seed image (default: built-in synthetic source)")
+    ap.add_argument("--speeds", nargs="*", default=sorted(mut.ENCODE_SPEEDS), help="Encode speeds to record")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument(
+        "--allow-encoder-drift",
+        action="store_true",
+        help="Only fail on decoded-pixel changes (e.g. after a Pillow/zlib/libjpeg upgrade)",
+    )
+    ap.add_argument(
+        "--allow-unrecorded",
+        action="store_true",
+        help="Do not fail on outputs the golden file has no entry for (new generators before a re-record)",
+    )
+    args = ap.parse_args()
+    if args.command == "record":
+        record(args)
+    else:
+        verify(args)
+
+
+if __name__ == "__main__":
+    main()
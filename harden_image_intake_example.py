@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 import sys, os
 from PIL import Image, ImageOps, ImageFile
+# Register only the decoders intake accepts; Image.open(formats=...) never reaches any other
+# plugin, and skipping Image.preinit()/init() keeps each short run from importing them all.
+from PIL import GifImagePlugin, JpegImagePlugin, PngImagePlugin, WebPImagePlugin
+Image._initialized = 2
 Image.MAX_IMAGE_PIXELS = 50_000_000
 ImageFile.LOAD_TRUNCATED_IMAGES = False
-ALLOWED_EXT={".png",".jpg",".jpeg",".webp",".gif"}; MAX_BYTES=20*1024*1024; MAX_DIM=4096
+ALLOWED_EXT={".png",".jpg",".jpeg",".webp",".gif"}; ALLOWED_FORMATS=("PNG","JPEG","WEBP","GIF"); MAX_BYTES=20*1024*1024; MAX_DIM=4096
 def harden(inp,outp):
     if os.path.splitext(inp.lower())[1] not in ALLOWED_EXT: raise ValueError("bad ext")
     if os.stat(inp).st_size > MAX_BYTES: raise ValueError("too large")
-    with Image.open(inp) as im:
+    with Image.open(inp, formats=ALLOWED_FORMATS) as im:
         im.load(); im = ImageOps.exif_transpose(im)
         if getattr(im,"is_animated",False): im.seek(0); im = im.convert("RGBA")
         if im.mode == "CMYK": im = im.convert("RGB")
@@ -15,6 +19,8 @@ def harden(inp,outp):
         if im.width > MAX_DIM or im.height > MAX_DIM: im.thumbnail((MAX_DIM,MAX_DIM), Image.Resampling.LANCZOS)
         clean = Image.new(im.mode, im.size); clean.putdata(list(im.getdata()))
         (clean.save(outp,"PNG",optimize=True) if clean.mode=="RGBA" else clean.save(outp,"JPEG",quality=90,optimize=True))
-if __name__=="__main__":
+def main():
     if len(sys.argv)!=3: print("Usage: python harden_image_intake_example.py input output"); raise SystemExit(2)
     harden(sys.argv[1], sys.argv[2]); print("Wrote", sys.argv[2])
+if __name__=="__main__":
+    main()
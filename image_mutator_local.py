@@ -1,11 +1,394 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
+import glob
+import importlib.util
+import io
 import math
+import mmap
 import os
+import queue
 import random
+import tempfile
+import warnings
+import weakref
+import zlib
+import sys
+from fractions import Fraction
+
+from PIL import Image, ImageChops, JpegImagePlugin, PngImagePlugin
+
+
+def lazy_import(name):
+    # Module whose code runs on first attribute access. Short runs that never
+    # reach a NumPy generator or a worker pool (JPEG-only packs, --help) skip
+    # importing NumPy and multiprocessing.
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+np = lazy_import("numpy")
+mp = lazy_import("multiprocessing")
+
+# Generators only write PNG and JPEG, and sources are nearly always one of the
+# two, so the imports above register just those plugins and Image.preinit()'s
+# other three are skipped.
+# Other source formats still open: Image.open falls back to Image.init().
+Image._initialized = max(Image._initialized, 1)
+
+
+# Per-run encoder knobs. "default" leaves every save exactly as the generator
+# wrote it. The other profiles only touch entropy-coding settings (zlib level
+# and strategy, JPEG Huffman optimisation); progressive scans, subsampling,
+# interlacing, palettes and metadata chunks stay as each generator asks.
+ENCODE_SPEEDS = {
+    "default": {"png": {}, "jpg": {}},
+    "fastest": {"png": {"compress_level": 0}, "jpg": {"optimize": False}},
+    "fast": {
+        "png": {"compress_level": 1, "compress_type": zlib.Z_RLE},
+        "jpg": {"optimize": False},
+    },
+    "small": {"png": {"compress_level": 9}, "jpg": {}},
+}
+
+_encode_speed = "default"
+
+
+def set_encode_speed(name):
+    global _encode_speed
+    if name not in ENCODE_SPEEDS:
+        raise ValueError(f"unknown encode speed {name!r}")
+    _encode_speed = name
+
+
+def save_png(im, outp, **kw):
+    kw.update(ENCODE_SPEEDS[_encode_speed]["png"])
+    im.save(outp, "PNG", **kw)
+
+
+def save_jpeg(im, outp, **kw):
+    kw.update(ENCODE_SPEEDS[_encode_speed]["jpg"])
+    im.save(outp, "JPEG", **kw)
+
+
+def png_chunks(data):
+    # (type, body) for every chunk of an in-memory PNG.
+    pos = 8
+    while pos < len(data):
+        n = int.from_bytes(data[pos : pos + 4], "big")
+        yield data[pos + 4 : pos + 8], data[pos + 8 : pos + 8 + n]
+        pos += 12 + n
+
+
+def write_chunk(fp, cid, body):
+    fp.write(len(body).to_bytes(4, "big") + cid + body + zlib.crc32(cid + body).to_bytes(4, "big"))
+
+
+class ApngWriter:
+    """APNG written frame by frame instead of from a list of every frame.
+
+    Frames are handled like Pillow's ``save(save_all=True)``: a frame equal
+    to what the previous one leaves on the canvas, with the same disposal and
+    blend, only extends the previous duration, and later frames are cropped to
+    the box that changed. So output matches the list-based save byte for byte.
+    Frames are written once the next one shows they will not be merged, and
+    only the last two are kept for disposal, so memory is flat in frame count.
+    Each frame is compressed by save_png (encode speeds apply) and its IDAT
+    chunks are rewrapped; acTL is patched with the frame count on close, so
+    the output has to be seekable (files and BytesIO are).
+    """
+
+    def __init__(self, outp, loop=0, disposal=0, blend=0, **png_kw):
+        self.own = isinstance(outp, (str, os.PathLike))
+        self.fp = open(outp, "wb") if self.own else outp
+        self.path = outp
+        self.loop = loop
+        self.disposal = disposal
+        self.blend = blend
+        self.png_kw = png_kw
+        self.frames = []  # [image, bbox, duration, disposal, blend], last two kept
+        self.count = 0
+        self.seq = 0
+        self.actl_pos = None
+        self.trailer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.own:
+            self.fp.close()
+            os.remove(self.path)
+
+    def add(self, frame, duration=0, disposal=None, blend=None):
+        frame = frame.convert("RGBA") if frame.mode != "RGBA" else frame.copy()
+        disposal = self.disposal if disposal is None else disposal
+        blend = self.blend if blend is None else blend
+        bbox = None
+        if self.frames:
+            prev = self.frames[-1]
+            prev_disposal = prev[3]
+            if prev_disposal == PngImagePlugin.Disposal.OP_PREVIOUS and self.count < 2:
+                prev_disposal = PngImagePlugin.Disposal.OP_BACKGROUND
+            if prev_disposal == PngImagePlugin.Disposal.OP_BACKGROUND:
+                base = prev[0].copy()
+                box = prev[1] or (0, 0) + frame.size
+                base.paste((0, 0, 0, 0), box)
+            elif prev_disposal == PngImagePlugin.Disposal.OP_PREVIOUS:
+                base = self.frames[-2][0]
+            else:
+                base = prev[0]
+            bbox = ImageChops.subtract_modulo(frame, base).getbbox(alpha_only=False)
+            if not bbox and prev_disposal == disposal and prev[4] == blend:
+                prev[2] += duration
+                return
+            self._write_frame(prev)
+            self.frames = self.frames[-1:]
+        self.frames.append([frame, bbox, duration, disposal, blend])
+        self.count += 1
+
+    def _encode(self, im):
+        buf = io.BytesIO()
+        save_png(im, buf, **self.png_kw)
+        return buf.getvalue()
+
+    def _write_frame(self, f):
+        im, bbox, duration, disposal, blend = f
+        if bbox:
+            im = im.crop(bbox)
+        else:
+            bbox = (0, 0) + im.size
+        delay = Fraction(duration / 1000).limit_denominator(65535)
+        if delay.numerator > 65535:
+            raise ValueError("cannot write duration")
+        chunks = list(png_chunks(self._encode(im)))
+        first = self.seq == 0
+        if first:
+            # Signature, IHDR and ancillary chunks come from the first frame's PNG.
+            self.fp.write(b"\x89PNG\r\n\x1a\n")
+            for cid, body in chunks:
+                if cid == b"IDAT":
+                    break
+                write_chunk(self.fp, cid, body)
+            self.actl_pos = self.fp.tell()
+            write_chunk(self.fp, b"acTL", bytes(4) + self.loop.to_bytes(4, "big"))
+        fctl = (
+            self.seq.to_bytes(4, "big")
+            + im.size[0].to_bytes(4, "big")
+            + im.size[1].to_bytes(4, "big")
+            + bbox[0].to_bytes(4, "big")
+            + bbox[1].to_bytes(4, "big")
+            + delay.numerator.to_bytes(2, "big")
+            + delay.denominator.to_bytes(2, "big")
+            + bytes([disposal, blend])
+        )
+        write_chunk(self.fp, b"fcTL", fctl)
+        self.seq += 1
+        idat = [i for i, (cid, _body) in enumerate(chunks) if cid == b"IDAT"]
+        for cid, body in chunks[idat[0] : idat[-1] + 1]:
+            if first:
+                write_chunk(self.fp, b"IDAT", body)
+            else:
+                write_chunk(self.fp, b"fdAT", self.seq.to_bytes(4, "big") + body)
+                self.seq += 1
+        if first:
+            self.trailer = chunks[idat[-1] + 1 :]
+
+    def close(self):
+        if self.count == 1:
+            # One frame left after merging: Pillow writes a plain PNG.
+            self.fp.write(self._encode(self.frames[0][0]))
+        elif self.count:
+            self._write_frame(self.frames[-1])
+            for cid, body in self.trailer:
+                write_chunk(self.fp, cid, body)
+            end = self.fp.tell()
+            self.fp.seek(self.actl_pos)
+            write_chunk(self.fp, b"acTL", self.count.to_bytes(4, "big") + self.loop.to_bytes(4, "big"))
+            self.fp.seek(end)
+        self.frames = []
+        if self.own:
+            self.fp.close()
+
+
+class CachedSource:
+    """Decoded source image whose ``convert(mode)`` results are built once.
+
+    Generators only read from the converted copies (they resize, copy into
+    NumPy or convert further), so one RGB/RGBA/L copy can serve every call.
+    Any other attribute is forwarded to the wrapped image.
+    """
+
+    def __init__(self, img):
+        img.load()
+        self.img = img
+        self._converted = {}
+
+    def convert(self, mode):
+        im = self._converted.get(mode)
+        if im is None:
+            im = self._converted[mode] = self.img.convert(mode)
+        return im
+
+    def __getattr__(self, name):
+        return getattr(self.img, name)
+
+
+# Modes generators ask CachedSource for. RGB is stored as RGBX, which is
+# Pillow's own in-memory layout for RGB, so it can be mapped without a copy.
+SHARED_MODES = (("RGB", "RGBX", 4), ("RGBA", "RGBA", 4), ("L", "L", 1))
+SHARED_BYTES_PER_PX = sum(bpp for _mode, _raw, bpp in SHARED_MODES)
+# Left free in /dev/shm for everyone else before we fall back to a file.
+SHM_HEADROOM = 16 << 20
+
+# Mappings whose close() hit BufferError because an image still pointed into
+# them; retried on the next SharedSource.close().
+_unclosed = []
+# Open SharedSources, closed at exit before module teardown drops the mapping
+# ahead of the images that point into it (spawned workers finalize normally).
+_live_sources = weakref.WeakSet()
+
+
+def shm_room():
+    # Free bytes behind POSIX shared memory, or None where there is no
+    # /dev/shm to ask (macOS, Windows): those are not size-capped like a tmpfs.
+    try:
+        st = os.statvfs("/dev/shm")
+    except (AttributeError, OSError):
+        return None
+    return st.f_bavail * st.f_frsize
+
+
+def publish_source(img):
+    """Convert a source once and write its RGB/RGBA/L pixels where workers can map them.
+
+    Uses POSIX shared memory when /dev/shm has room. Docker's default 64 MB
+    /dev/shm does not hold a large source, and writing past it raises SIGBUS
+    rather than an error, so those sources go to a temp file that workers mmap.
+    Returns (owner, handle): pass ``owner`` to release_source once the workers
+    are done, and ``handle`` (small, picklable) to SharedSource in each worker.
+    """
+    img.load()
+    w, h = img.size
+    total = max(1, w * h * SHARED_BYTES_PER_PX)
+    room = shm_room()
+    if room is None or room >= total + SHM_HEADROOM:
+        from multiprocessing import shared_memory
+
+        owner = shared_memory.SharedMemory(create=True, size=total)
+        where = ("shm", owner.name)
+        out = owner.buf
+    else:
+        fd, path = tempfile.mkstemp(prefix="weird_src_", suffix=".raw")
+        owner = path
+        where = ("file", path)
+        out = os.fdopen(fd, "wb")
+    layout = []
+    offset = 0
+    try:
+        for mode, raw, bpp in SHARED_MODES:
+            data = img.convert(mode).tobytes("raw", raw)
+            if where[0] == "shm":
+                out[offset : offset + len(data)] = data
+            else:
+                out.write(data)
+            layout.append((mode, offset, len(data)))
+            offset += len(data)
+    except BaseException:
+        release_source(owner)
+        raise
+    finally:
+        if where[0] == "file":
+            out.close()
+    return owner, (where, img.size, tuple(layout))
+
+
+def release_source(owner):
+    if isinstance(owner, str):
+        os.remove(owner)
+    else:
+        owner.close()
+        owner.unlink()
+
 
-import numpy as np
-from PIL import Image, PngImagePlugin
+def attach_source_block(where):
+    # -> (closeable, buffer). The parent owns and removes the block.
+    kind, name = where
+    if kind == "file":
+        with open(name, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mm, memoryview(mm)
+    from multiprocessing import shared_memory
+
+    # Before 3.13 attaching also registers the segment, but pool workers share
+    # the parent's resource tracker, so that is a no-op there.
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, shm.buf
+
+
+def map_image(buf, mode, size):
+    # Read-only image backed by buf; Pillow copies on first write.
+    if mode == "RGB":
+        # Image.frombuffer refuses to map RGB, but the core can: the buffer is
+        # already in RGBX layout. This leans on Pillow internals, so say so if
+        # they move instead of quietly giving every worker its own copy.
+        try:
+            im = Image.new("RGB", (0, 0))._new(Image.core.map_buffer(buf, size, "raw", 0, ("RGB", 0, 1)))
+        except (AttributeError, TypeError, ValueError) as e:
+            warnings.warn(f"cannot map shared RGB source ({e}); each worker keeps a private RGB copy", RuntimeWarning)
+            return Image.frombuffer("RGBX", size, buf, "raw", "RGBX", 0, 1).convert("RGB")
+        im.readonly = 1
+        return im
+    return Image.frombuffer(mode, size, buf, "raw", mode, 0, 1)
+
+
+class SharedSource(CachedSource):
+    """CachedSource whose RGB/RGBA/L copies live in memory the parent published.
+
+    Built from a publish_source handle inside a worker. Every worker maps the
+    same pages, so N workers cost one decoded source instead of N.
+    """
+
+    def __init__(self, handle):
+        where, size, layout = handle
+        block, buf = attach_source_block(where)
+        self._converted = {mode: map_image(buf[offset : offset + n], mode, size) for mode, offset, n in layout}
+        self.img = self._converted["RGB"]
+        # Set last so it is released after the images that point into it.
+        self.block = block
+        _live_sources.add(self)
+
+    def close(self):
+        # An image a generator kept (or a NumPy view of one) still points into
+        # the mapping; keep it until a later close() finds it free.
+        self._converted = {}
+        self.img = None
+        if self.block is not None:
+            _unclosed.append(self.block)
+            self.block = None
+        for block in list(_unclosed):
+            try:
+                block.close()
+                _unclosed.remove(block)
+            except BufferError:
+                pass
+
+
+@atexit.register
+def close_shared_sources():
+    for src in list(_live_sources):
+        src.close()
 
 
 def ensure_dir(path):
@@ -16,12 +399,35 @@ def rng_choice(rng, items):
     return items[rng.randrange(len(items))]
 
 
+# Pattern kernels below work on uint16 row/column index vectors that broadcast
+# against each other instead of int64 np.indices planes. Every result is taken
+# mod 256, and +, *, ^ mod 256 only depend on the low byte of their operands,
+# so those terms are reduced to uint8 early. A right shift pulls higher bits
+# down; a uint16 product keeps bits up to 15, enough for any shift <= 8.
+def index_axes(w, h):
+    return np.arange(w, dtype=np.uint16), np.arange(h, dtype=np.uint16)[:, None]
+
+
+def low_byte(v):
+    return (v & 0xFF).astype(np.uint8)
+
+
+def xor_shift_pattern(w, h, xmul, ymul, shift):
+    # ((x * xmul) ^ (y * ymul) ^ ((x * y) >> shift)) % 256 as a uint8 plane.
+    x, y = index_axes(w, h)
+    p = np.multiply(x, y)
+    p >>= shift
+    p ^= x * xmul
+    p ^= y * ymul
+    return p.astype(np.uint8)
+
+
 def exif_orient(img, outp, rng):
     ex = Image.Exif()
     ex[0x0112] = rng_choice(rng, [2, 3, 4, 5, 6, 7, 8])
     ex[0x010E] = "local test " + ("X" * rng.randint(100, 1200))
-    img.convert("RGB").save(
-        outp, "JPEG", quality=rng.randint(82, 96), exif=ex, optimize=True
+    save_jpeg(
+        img.convert("RGB"), outp, quality=rng.randint(82, 96), exif=ex, optimize=True
     )
 
 
@@ -29,29 +435,39 @@ def prog_gray(img, outp, rng):
     g = img.convert("L")
     w, h = g.size
     g = g.resize((max(17, w | 1), max(17, h | 1)))
-    g.save(
-        outp, "JPEG", progressive=True, quality=rng.randint(85, 97), optimize=True
-    )
+    save_jpeg(g, outp, progressive=True, quality=rng.randint(85, 97), optimize=True)
 
 
 def cmyk_prog(img, outp, rng):
-    img.convert("RGB").convert("CMYK").save(
-        outp, "JPEG", progressive=True, quality=rng.randint(85, 97), optimize=True
+    save_jpeg(
+        img.convert("RGB").convert("CMYK"),
+        outp,
+        progressive=True,
+        quality=rng.randint(85, 97),
+        optimize=True,
     )
 
 
 def png_palette_trns(img, outp, rng):
     q = img.convert("RGBA").convert("P", palette=Image.Palette.ADAPTIVE, colors=256)
     q.info["transparency"] = bytes([(i * rng.randint(3, 17)) % 256 for i in range(256)])
-    q.save(outp, "PNG", interlace=1, optimize=False)
+    save_png(q, outp, interlace=1, optimize=False)
+
+
+def colorkey_mask(w, h, m):
+    # (x * 13 + y * 17) % m == 0. m is not a power of two, so each axis term is
+    # reduced mod m (< 128) exactly in int64 and only the sum plane is uint8.
+    rx = ((np.arange(w, dtype=np.int64) * 13) % m).astype(np.uint8)
+    ry = ((np.arange(h, dtype=np.int64) * 17) % m).astype(np.uint8)[:, None]
+    s = rx + ry
+    return (s == 0) | (s == m)
 
 
 def png_colorkey_meta(img, outp, rng):
     rgb = img.convert("RGB")
     arr = np.array(rgb)
     h, w = arr.shape[:2]
-    yy, xx = np.indices((h, w))
-    arr[(xx * 13 + yy * 17) % rng_choice(rng, [89, 97, 101]) == 0] = [255, 0, 255]
+    arr[colorkey_mask(w, h, rng_choice(rng, [89, 97, 101]))] = [255, 0, 255]
     rgb = Image.fromarray(arr, "RGB")
     rgb.info["transparency"] = (255, 0, 255)
     info = PngImagePlugin.PngInfo()
@@ -59,9 +475,9 @@ def png_colorkey_meta(img, outp, rng):
         info.add_text(
             f"z{i}", ("META_" * rng.randint(200, 600)) + str(i), zip=True
         )
-    rgb.save(
+    save_png(
+        rgb,
         outp,
-        "PNG",
         pnginfo=info,
         dpi=(rng_choice(rng, [72, 96, 300, 1200, 3000]), rng_choice(rng, [1, 72, 96])),
     )
@@ -70,121 +486,108 @@ def png_colorkey_meta(img, outp, rng):
 def png_gray16(img, outp, rng):
     del rng
     arr = np.array(img.convert("L"), dtype=np.uint16) * 257
-    Image.fromarray(arr, "I;16").save(outp, "PNG")
+    save_png(Image.fromarray(arr, "I;16"), outp)
 
 
 def apng_preview(img, outp, rng):
     base = img.convert("RGBA").resize((320, 320))
     arr = np.array(base)
     yy, xx = np.indices((320, 320))
-    frames = []
-    durations = []
-    for i in range(rng_choice(rng, [12, 16])):
-        a = np.roll(np.roll(arr.copy(), i * 5, axis=1), i * 3, axis=0)
-        ring = np.sqrt((xx - 160) ** 2 + (yy - 160) ** 2)
-        alpha = np.clip(255 - np.abs(ring - (20 + (i * 7) % 120)) * 4, 0, 255).astype(
-            np.uint8
-        )
-        a[..., 3] = np.maximum(a[..., 3], alpha)
-        frames.append(
-            Image.fromarray(a, "RGBA")
-            .convert("P", palette=Image.Palette.ADAPTIVE, colors=128)
-            .convert("RGBA")
-        )
-        durations.append(rng_choice(rng, [60, 80, 90, 100, 120]))
-    frames[0].save(
-        outp,
-        "PNG",
-        save_all=True,
-        append_images=frames[1:],
-        duration=durations,
-        loop=0,
-        disposal=2,
-    )
+    with ApngWriter(outp, loop=0, disposal=2) as apng:
+        for i in range(rng_choice(rng, [12, 16])):
+            a = np.roll(np.roll(arr.copy(), i * 5, axis=1), i * 3, axis=0)
+            ring = np.sqrt((xx - 160) ** 2 + (yy - 160) ** 2)
+            alpha = np.clip(255 - np.abs(ring - (20 + (i * 7) % 120)) * 4, 0, 255).astype(
+                np.uint8
+            )
+            a[..., 3] = np.maximum(a[..., 3], alpha)
+            apng.add(
+                Image.fromarray(a, "RGBA")
+                .convert("P", palette=Image.Palette.ADAPTIVE, colors=128)
+                .convert("RGBA"),
+                rng_choice(rng, [60, 80, 90, 100, 120]),
+            )
 
 
 def png_apng_invisible_firstframe(img, outp, rng):
     base = img.convert("RGBA").resize((256, 256))
     arr = np.array(base)
     yy, xx = np.indices((256, 256))
-    frames = []
-    durations = []
-    for i in range(rng_choice(rng, [16, 20, 24])):
-        a = np.roll(np.roll(arr.copy(), i * 7, axis=1), i * 5, axis=0)
-        if i == 0:
-            a[..., 3] = 0
-            durations.append(350)
-        else:
-            ring = np.sqrt((xx - 128) ** 2 + (yy - 128) ** 2)
-            alpha = np.clip(255 - ring * (1.8 + (i % 3) * 0.2), 0, 255).astype(np.uint8)
-            a[..., 3] = np.maximum(a[..., 3], alpha)
-            durations.append(rng_choice(rng, [30, 40, 50, 60]))
-        frames.append(
-            Image.fromarray(a, "RGBA")
-            .convert("P", palette=Image.Palette.ADAPTIVE, colors=128)
-            .convert("RGBA")
-        )
-    frames[0].save(
-        outp,
-        "PNG",
-        save_all=True,
-        append_images=frames[1:],
-        duration=durations,
-        loop=0,
-        disposal=2,
-    )
+    with ApngWriter(outp, loop=0, disposal=2) as apng:
+        for i in range(rng_choice(rng, [16, 20, 24])):
+            a = np.roll(np.roll(arr.copy(), i * 7, axis=1), i * 5, axis=0)
+            if i == 0:
+                a[..., 3] = 0
+                duration = 350
+            else:
+                ring = np.sqrt((xx - 128) ** 2 + (yy - 128) ** 2)
+                alpha = np.clip(255 - ring * (1.8 + (i % 3) * 0.2), 0, 255).astype(np.uint8)
+                a[..., 3] = np.maximum(a[..., 3], alpha)
+                duration = rng_choice(rng, [30, 40, 50, 60])
+            apng.add(
+                Image.fromarray(a, "RGBA")
+                .convert("P", palette=Image.Palette.ADAPTIVE, colors=128)
+                .convert("RGBA"),
+                duration,
+            )
 
 
 def png_apng_tiny_burst(img, outp, rng):
     del img
     w = h = rng_choice(rng, [17, 23, 29, 31])
     yy, xx = np.indices((h, w))
-    frames = []
-    durations = []
-    for i in range(rng_choice(rng, [36, 48, 60])):
-        rgba = np.zeros((h, w, 4), dtype=np.uint8)
-        rgba[..., 0] = ((xx * 17 + i * 9) % 256).astype(np.uint8)
-        rgba[..., 1] = ((yy * 13 + i * 7) % 256).astype(np.uint8)
-        rgba[..., 2] = (((xx ^ yy) + i * 11) % 256).astype(np.uint8)
-        rgba[..., 3] = ((((xx + yy + i) % 3) == 0) * 255).astype(np.uint8)
-        frames.append(Image.fromarray(rgba, "RGBA"))
-        durations.append(20 if i % 5 else 220)
-    frames[0].save(
-        outp,
-        "PNG",
-        save_all=True,
-        append_images=frames[1:],
-        duration=durations,
-        loop=0,
-        disposal=2,
-    )
+    with ApngWriter(outp, loop=0, disposal=2) as apng:
+        for i in range(rng_choice(rng, [36, 48, 60])):
+            rgba = np.zeros((h, w, 4), dtype=np.uint8)
+            rgba[..., 0] = ((xx * 17 + i * 9) % 256).astype(np.uint8)
+            rgba[..., 1] = ((yy * 13 + i * 7) % 256).astype(np.uint8)
+            rgba[..., 2] = (((xx ^ yy) + i * 11) % 256).astype(np.uint8)
+            rgba[..., 3] = ((((xx + yy + i) % 3) == 0) * 255).astype(np.uint8)
+            apng.add(Image.fromarray(rgba, "RGBA"), 20 if i % 5 else 220)
 
 
 def png_palette_fulltrns_interlaced(img, outp, rng):
     src = img.convert("RGB").resize((rng_choice(rng, [1024, 1536]), rng_choice(rng, [512, 768])))
     arr = np.array(src)
-    yy, xx = np.indices(arr.shape[:2])
-    idx = ((arr[..., 0].astype(np.uint16) * 3 + arr[..., 1].astype(np.uint16) * 5 + xx + yy) % 256).astype(np.uint8)
+    h, w = arr.shape[:2]
+    x, y = index_axes(w, h)
+    # (r * 3 + g * 5 + x + y) % 256 accumulated in uint8; arr is scratch here.
+    idx = np.multiply(arr[..., 0], 3)
+    idx += np.multiply(arr[..., 1], 5, out=arr[..., 1])
+    idx += low_byte(x)
+    idx += low_byte(y)
     pal = Image.fromarray(idx, "P")
     palette = []
     for i in range(256):
         palette.extend([(i * 97) % 256, (255 - i), (i * 53) % 256])
     pal.putpalette(palette)
     pal.info["transparency"] = bytes([(i * rng_choice(rng, [7, 11, 19])) % 256 for i in range(256)])
-    pal.save(outp, "PNG", interlace=1, optimize=False)
+    save_png(pal, outp, interlace=1, optimize=False)
 
 
 def png_la_moire(img, outp, rng):
     w, h = rng_choice(rng, [(1024, 1024), (1600, 900), (2048, 1024)])
     base = img.convert("L").resize((w, h))
-    yy, xx = np.indices((h, w))
-    lum = ((np.array(base, dtype=np.uint16) + (((np.sin(xx / 1.7) + np.cos(yy / 2.3)) * 63 + 128) % 256).astype(np.uint16)) % 256).astype(np.uint8)
+    x, y = index_axes(w, h)
+    la = np.empty((h, w, 2), dtype=np.uint8)
+    la[..., 0] = np.asarray(base)
+    # sin/cos per row and column, then one float64 plane for the sum, exactly
+    # as the per-pixel form rounds it.
+    wave = np.add(np.sin(x.astype(np.float64) / 1.7), np.cos(y.astype(np.float64) / 2.3))
+    wave *= 63
+    wave += 128
+    np.mod(wave, 256, out=wave)
+    np.add(la[..., 0], wave.astype(np.uint16), out=la[..., 0], casting="unsafe")
+    del wave
     xdiv = rng_choice(rng, [1, 2, 3])
     ydiv = rng_choice(rng, [2, 3, 5])
     mod = rng_choice(rng, [5, 7, 9])
     threshold = rng_choice(rng, [2, 3, 4])
-    alpha = ((((xx // xdiv) ^ (yy // ydiv)) % mod) < threshold).astype(np.uint8) * 255
-    Image.fromarray(np.dstack([lum, alpha]), "LA").save(outp, "PNG")
+    t = np.bitwise_xor(x // xdiv, y // ydiv)
+    np.remainder(t, mod, out=t)
+    np.less(t, threshold, out=la[..., 1], casting="unsafe")
+    la[..., 1] *= 255
+    save_png(Image.fromarray(la, "LA"), outp)
 
 
 def png_huge_dims_tiny_content(img, outp, rng):
@@ -203,15 +606,17 @@ def png_huge_dims_tiny_content(img, outp, rng):
     else:
         x = (w - strip_w) // 2
         canvas.paste(patch, (x, (h - strip_h) // 2))
-    canvas.save(outp, "PNG")
+    save_png(canvas, outp)
 
 
 def png_gray16_gradient_strip(img, outp, rng):
     del img
     w, h = rng_choice(rng, [(4096, 256), (8192, 8), (2048, 2048)])
-    yy, xx = np.indices((h, w))
-    arr = (((xx * 65535) // max(1, w - 1)) ^ ((yy * 257) % 65536)).astype(np.uint16)
-    Image.fromarray(arr, "I;16").save(outp, "PNG")
+    # Row and column terms are computed once in int64 and fit uint16 exactly.
+    ramp = ((np.arange(w, dtype=np.int64) * 65535) // max(1, w - 1)).astype(np.uint16)
+    stripe = ((np.arange(h, dtype=np.int64) * 257) % 65536).astype(np.uint16)[:, None]
+    arr = np.bitwise_xor(ramp, stripe)
+    save_png(Image.fromarray(arr, "I;16"), outp)
 
 
 def png_apng_odd_canvas_stutter(img, outp, rng):
@@ -219,32 +624,21 @@ def png_apng_odd_canvas_stutter(img, outp, rng):
     base = img.convert("RGBA").resize((w, h))
     arr = np.array(base)
     yy, xx = np.indices((h, w))
-    frames = []
-    durations = []
     frame_count = rng_choice(rng, [72, 84, 96])
-    for i in range(frame_count):
-        a = np.roll(np.roll(arr.copy(), (i * 3) % w, axis=1), (i * 2) % h, axis=0)
-        checker = ((((xx + yy + i) % rng_choice(rng, [3, 4, 5])) == 0) * 255).astype(np.uint8)
-        ring = (
-            (
-                np.sqrt((xx - (w // 2)) ** 2 + (yy - (h // 2)) ** 2).astype(np.int32)
-                + i * rng_choice(rng, [2, 3, 5])
-            )
-            % rng_choice(rng, [7, 9, 11])
-            < 2
-        ).astype(np.uint8) * 255
-        a[..., 3] = np.maximum(a[..., 3], (checker & ring).astype(np.uint8))
-        frames.append(Image.fromarray(a, "RGBA"))
-        durations.append(15 if i % 8 else 220)
-    frames[0].save(
-        outp,
-        "PNG",
-        save_all=True,
-        append_images=frames[1:],
-        duration=durations,
-        loop=0,
-        disposal=2,
-    )
+    with ApngWriter(outp, loop=0, disposal=2) as apng:
+        for i in range(frame_count):
+            a = np.roll(np.roll(arr.copy(), (i * 3) % w, axis=1), (i * 2) % h, axis=0)
+            checker = ((((xx + yy + i) % rng_choice(rng, [3, 4, 5])) == 0) * 255).astype(np.uint8)
+            ring = (
+                (
+                    np.sqrt((xx - (w // 2)) ** 2 + (yy - (h // 2)) ** 2).astype(np.int32)
+                    + i * rng_choice(rng, [2, 3, 5])
+                )
+                % rng_choice(rng, [7, 9, 11])
+                < 2
+            ).astype(np.uint8) * 255
+            a[..., 3] = np.maximum(a[..., 3], (checker & ring).astype(np.uint8))
+            apng.add(Image.fromarray(a, "RGBA"), 15 if i % 8 else 220)
 
 
 def png_apng_alpha_blocks_irregular(img, outp, rng):
@@ -252,43 +646,32 @@ def png_apng_alpha_blocks_irregular(img, outp, rng):
     base = img.convert("RGBA").resize((w, h))
     arr = np.array(base)
     yy, xx = np.indices((h, w))
-    frames = []
-    durations = []
-    for i in range(rng_choice(rng, [24, 36, 48])):
-        a = arr.copy()
-        a[..., :3] = np.roll(a[..., :3], i * rng_choice(rng, [3, 5, 7]), axis=1)
-        a[..., :3] = np.roll(a[..., :3], i * rng_choice(rng, [2, 4, 6]), axis=0)
-        cx = int(w / 2 + (w * 0.22) * math.sin(i / 4.0))
-        cy = int(h / 2 + (h * 0.18) * math.cos(i / 5.0))
-        rx = 18 + (i % 5) * 7
-        ry = 14 + (i % 4) * 6
-        box = (np.abs(xx - cx) < rx) & (np.abs(yy - cy) < ry)
-        stripes = (((xx // rng_choice(rng, [3, 4, 5])) ^ (yy // rng_choice(rng, [4, 6, 8])) ^ i) & 1) == 0
-        alpha = np.where(box | stripes, 255, 0).astype(np.uint8)
-        a[..., 3] = np.maximum(a[..., 3], alpha)
-        frames.append(
-            Image.fromarray(a, "RGBA")
-            .convert("P", palette=Image.Palette.ADAPTIVE, colors=128)
-            .convert("RGBA")
-        )
-        durations.append(20 if i % 9 else 260)
-    frames[0].save(
-        outp,
-        "PNG",
-        save_all=True,
-        append_images=frames[1:],
-        duration=durations,
-        loop=0,
-        disposal=2,
-    )
+    with ApngWriter(outp, loop=0, disposal=2) as apng:
+        for i in range(rng_choice(rng, [24, 36, 48])):
+            a = arr.copy()
+            a[..., :3] = np.roll(a[..., :3], i * rng_choice(rng, [3, 5, 7]), axis=1)
+            a[..., :3] = np.roll(a[..., :3], i * rng_choice(rng, [2, 4, 6]), axis=0)
+            cx = int(w / 2 + (w * 0.22) * math.sin(i / 4.0))
+            cy = int(h / 2 + (h * 0.18) * math.cos(i / 5.0))
+            rx = 18 + (i % 5) * 7
+            ry = 14 + (i % 4) * 6
+            box = (np.abs(xx - cx) < rx) & (np.abs(yy - cy) < ry)
+            stripes = (((xx // rng_choice(rng, [3, 4, 5])) ^ (yy // rng_choice(rng, [4, 6, 8])) ^ i) & 1) == 0
+            alpha = np.where(box | stripes, 255, 0).astype(np.uint8)
+            a[..., 3] = np.maximum(a[..., 3], alpha)
+            apng.add(
+                Image.fromarray(a, "RGBA")
+                .convert("P", palette=Image.Palette.ADAPTIVE, colors=128)
+                .convert("RGBA"),
+                20 if i % 9 else 260,
+            )
 
 
 def png_colorkey_meta_itxt_heavy(img, outp, rng):
     rgb = img.convert("RGB").resize(rng_choice(rng, [(1024, 768), (1400, 933), (1600, 1200)]))
     arr = np.array(rgb)
     h, w = arr.shape[:2]
-    yy, xx = np.indices((h, w))
-    arr[(xx * 13 + yy * 17) % rng_choice(rng, [89, 97, 101, 113]) == 0] = [255, 0, 255]
+    arr[colorkey_mask(w, h, rng_choice(rng, [89, 97, 101, 113]))] = [255, 0, 255]
     rgb = Image.fromarray(arr, "RGB")
     rgb.info["transparency"] = (255, 0, 255)
     info = PngImagePlugin.PngInfo()
@@ -304,9 +687,9 @@ def png_colorkey_meta_itxt_heavy(img, outp, rng):
             tkey=f"u{i}",
             zip=bool(i % 2),
         )
-    rgb.save(
+    save_png(
+        rgb,
         outp,
-        "PNG",
         pnginfo=info,
         dpi=(rng_choice(rng, [1, 72, 300, 655, 3000]), rng_choice(rng, [1, 72, 96, 1000])),
         optimize=False,
@@ -320,12 +703,13 @@ def png_extreme_aspect_line(img, outp, rng):
         w, h = rng_choice(rng, [(1, 65535), (3, 32767), (7, 16384)])
     else:
         w, h = rng_choice(rng, [(65535, 1), (32767, 3), (16384, 7)])
-    yy, xx = np.indices((h, w))
-    rgb = np.zeros((h, w, 3), dtype=np.uint8)
-    rgb[..., 0] = ((xx * 37 + yy * 11) % 256).astype(np.uint8)
-    rgb[..., 1] = ((yy * 97 + xx * 3) % 256).astype(np.uint8)
-    rgb[..., 2] = (((xx ^ yy) * 13) % 256).astype(np.uint8)
-    Image.fromarray(rgb, "RGB").save(outp, "PNG")
+    x, y = index_axes(w, h)
+    rgb = np.empty((h, w, 3), dtype=np.uint8)
+    np.add(low_byte(x * 37), low_byte(y * 11), out=rgb[..., 0])
+    np.add(low_byte(y * 97), low_byte(x * 3), out=rgb[..., 1])
+    np.bitwise_xor(low_byte(x), low_byte(y), out=rgb[..., 2])
+    rgb[..., 2] *= 13
+    save_png(Image.fromarray(rgb, "RGB"), outp)
 
 
 def png_palette_lowbit_trns(img, outp, rng):
@@ -350,7 +734,7 @@ def png_palette_lowbit_trns(img, outp, rng):
     ] + [0, 0, 0] * (256 - 4)
     pal.putpalette(palette)
     pal.info["transparency"] = bytes([0, 80, 180, 255])
-    pal.save(outp, "PNG", interlace=rng_choice(rng, [0, 1]), optimize=False)
+    save_png(pal, outp, interlace=rng_choice(rng, [0, 1]), optimize=False)
 
 
 def jpg_exif_orient_comment_heavy(img, outp, rng):
@@ -358,9 +742,9 @@ def jpg_exif_orient_comment_heavy(img, outp, rng):
     ex[0x0112] = rng_choice(rng, [3, 6, 8])
     ex[0x010E] = "thumbnail edge case " + ("A" * rng.randint(600, 2400))
     rgb = img.convert("RGB").resize((rng_choice(rng, [1400, 1600, 1800]), rng_choice(rng, [900, 1000, 1200])))
-    rgb.save(
+    save_jpeg(
+        rgb,
         outp,
-        "JPEG",
         quality=rng.randint(88, 96),
         optimize=True,
         exif=ex,
@@ -371,40 +755,56 @@ def jpg_exif_orient_comment_heavy(img, outp, rng):
 def jpg_progressive_grayscale_odd(img, outp, rng):
     del img
     w, h = rng_choice(rng, [(2201, 1469), (2601, 1733), (3001, 1999)])
-    yy, xx = np.indices((h, w))
-    g = (((xx * 29) ^ (yy * 31) ^ ((xx * yy) >> 4)) % 256).astype(np.uint8)
-    Image.fromarray(g, "L").save(
-        outp, "JPEG", quality=rng.randint(90, 96), progressive=True, optimize=True
+    g = xor_shift_pattern(w, h, 29, 31, 4)
+    save_jpeg(
+        Image.fromarray(g, "L"),
+        outp,
+        quality=rng.randint(90, 96),
+        progressive=True,
+        optimize=True,
     )
 
 
 def jpg_cmyk_progressive_odd_aspect(img, outp, rng):
     rgb = img.convert("RGB").resize(rng_choice(rng, [(1600, 700), (2200, 900), (2049, 341), (3073, 513)]))
-    rgb.convert("CMYK").save(
-        outp, "JPEG", quality=rng.randint(92, 97), progressive=True, optimize=True
+    save_jpeg(
+        rgb.convert("CMYK"),
+        outp,
+        quality=rng.randint(92, 97),
+        progressive=True,
+        optimize=True,
     )
 
 
 def jpg_progressive_444_exif_comment(img, outp, rng):
     w, h = rng_choice(rng, [(1537, 1025), (1800, 1201), (2049, 1365)])
-    yy, xx = np.indices((h, w))
-    base = np.array(img.convert("RGB").resize((w, h)))
-    pattern = np.dstack(
-        [
-            ((xx * 23 + yy * 11) % 256).astype(np.uint8),
-            ((((xx * yy) >> 6) + yy) % 256).astype(np.uint8),
-            (((xx // 2) ^ (yy // 3) ^ xx) % 256).astype(np.uint8),
-        ]
-    )
-    rgb = ((base.astype(np.uint16) // 2 + pattern.astype(np.uint16) // 2) % 256).astype(np.uint8)
+    x, y = index_axes(w, h)
+    # base // 2 + pattern // 2 never exceeds 254, so each channel halves in place
+    # and takes its halved pattern without widening.
+    rgb = np.array(img.convert("RGB").resize((w, h)))
+    rgb >>= 1
+    tmp = np.empty((h, w), dtype=np.uint8)
+    np.add(low_byte(x * 23), low_byte(y * 11), out=tmp)
+    tmp >>= 1
+    rgb[..., 0] += tmp
+    p = np.multiply(x, y)
+    p >>= 6
+    p += y
+    np.right_shift(p, 1, out=p)
+    np.bitwise_and(p, 0x7F, out=p)
+    np.add(rgb[..., 1], p, out=rgb[..., 1], casting="unsafe")
+    del p
+    np.bitwise_xor(low_byte((x // 2) ^ x), low_byte(y // 3), out=tmp)
+    tmp >>= 1
+    rgb[..., 2] += tmp
     ex = Image.Exif()
     ex[0x0112] = rng_choice(rng, [6, 8])
     ex[0x010E] = "render path " + ("A" * rng.randint(400, 1600))
     im = Image.fromarray(rgb, "RGB")
     try:
-        im.save(
+        save_jpeg(
+            im,
             outp,
-            "JPEG",
             quality=rng.randint(93, 97),
             progressive=True,
             optimize=True,
@@ -414,9 +814,9 @@ def jpg_progressive_444_exif_comment(img, outp, rng):
         )
     except OSError:
         # Pillow occasionally chokes on some optimize+444+metadata combinations.
-        im.resize((max(513, w - 1), max(513, h - 1))).save(
+        save_jpeg(
+            im.resize((max(513, w - 1), max(513, h - 1))),
             outp,
-            "JPEG",
             quality=92,
             progressive=True,
             optimize=False,
@@ -429,23 +829,25 @@ def jpg_progressive_444_exif_comment(img, outp, rng):
 def jpg_baseline_444_odd(img, outp, rng):
     w, h = rng_choice(rng, [(2200, 1400), (2400, 1600), (2048, 2048)])
     arr = np.array(img.convert("RGB").resize((w, h)))
-    yy, xx = np.indices((h, w))
-    arr[..., 0] = ((arr[..., 0].astype(np.uint16) + ((xx + yy) % 256).astype(np.uint16)) % 256).astype(np.uint8)
-    arr[..., 1] = ((arr[..., 1].astype(np.uint16) + ((xx ^ yy) % 256).astype(np.uint16)) % 256).astype(np.uint8)
+    x, y = index_axes(w, h)
+    # uint8 adds wrap mod 256, so the row/column terms go straight into the channels.
+    arr[..., 0] += low_byte(x)
+    arr[..., 0] += low_byte(y)
+    arr[..., 1] += np.bitwise_xor(low_byte(x), low_byte(y))
     im = Image.fromarray(arr, "RGB")
     try:
-        im.save(
+        save_jpeg(
+            im,
             outp,
-            "JPEG",
             quality=rng.randint(90, 96),
             optimize=True,
             progressive=False,
             subsampling=0,
         )
     except OSError:
-        im.resize((max(513, w - 1), max(513, h - 1))).save(
+        save_jpeg(
+            im.resize((max(513, w - 1), max(513, h - 1))),
             outp,
-            "JPEG",
             quality=90,
             optimize=False,
             progressive=False,
@@ -458,17 +860,17 @@ def jpg_cmyk_baseline_odd_aspect(img, outp, rng):
         rng_choice(rng, [(2049, 1025), (3073, 513), (1601, 901), (2201, 701)])
     )
     try:
-        rgb.convert("CMYK").save(
+        save_jpeg(
+            rgb.convert("CMYK"),
             outp,
-            "JPEG",
             quality=rng.randint(94, 98),
             progressive=False,
             optimize=True,
         )
     except OSError:
-        rgb.resize((max(513, rgb.width - 1), max(257, rgb.height - 1))).convert("CMYK").save(
+        save_jpeg(
+            rgb.resize((max(513, rgb.width - 1), max(257, rgb.height - 1))).convert("CMYK"),
             outp,
-            "JPEG",
             quality=94,
             progressive=False,
             optimize=False,
@@ -481,9 +883,9 @@ def jpg_exif_mirror_orient_comment(img, outp, rng):
     ex[0x010E] = "mirror-orient edge case " + ("M" * rng.randint(400, 2000))
     rgb = img.convert("RGB").resize(rng_choice(rng, [(1801, 1201), (1600, 1067), (1401, 933)]))
     try:
-        rgb.save(
+        save_jpeg(
+            rgb,
             outp,
-            "JPEG",
             quality=rng.randint(90, 96),
             optimize=True,
             progressive=rng_choice(rng, [False, True]),
@@ -491,9 +893,9 @@ def jpg_exif_mirror_orient_comment(img, outp, rng):
             comment=(b"MIRRORCOM_" * rng_choice(rng, [20, 40, 60])),
         )
     except OSError:
-        rgb.save(
+        save_jpeg(
+            rgb,
             outp,
-            "JPEG",
             quality=90,
             optimize=False,
             progressive=False,
@@ -505,11 +907,10 @@ def jpg_exif_mirror_orient_comment(img, outp, rng):
 def jpg_prog_gray_prime_comment(img, outp, rng):
     del img
     w, h = rng_choice(rng, [(3001, 2003), (4093, 3079), (2609, 1733)])
-    yy, xx = np.indices((h, w))
-    g = (((xx * 31) ^ (yy * 17) ^ ((xx * yy) >> 3)) % 256).astype(np.uint8)
-    Image.fromarray(g, "L").save(
+    g = xor_shift_pattern(w, h, 31, 17, 3)
+    save_jpeg(
+        Image.fromarray(g, "L"),
         outp,
-        "JPEG",
         quality=rng.randint(92, 97),
         progressive=True,
         optimize=True,
@@ -519,19 +920,25 @@ def jpg_prog_gray_prime_comment(img, outp, rng):
 
 def jpg_prog_444_highq_odd(img, outp, rng):
     w, h = rng_choice(rng, [(2100, 1337), (2200, 1463), (2401, 1601)])
-    yy, xx = np.indices((h, w))
+    x, y = index_axes(w, h)
     base = np.array(img.convert("RGB").resize((w, h)))
-    base[..., 0] = ((base[..., 0].astype(np.uint16) + ((xx * 7 + yy * 13) % 256).astype(np.uint16)) % 256).astype(np.uint8)
-    base[..., 1] = ((base[..., 1].astype(np.uint16) + (((xx ^ yy) * 5) % 256).astype(np.uint16)) % 256).astype(np.uint8)
-    base[..., 2] = ((base[..., 2].astype(np.uint16) + (((xx * yy) >> 5) % 256).astype(np.uint16)) % 256).astype(np.uint8)
+    base[..., 0] += low_byte(x * 7)
+    base[..., 0] += low_byte(y * 13)
+    tmp = np.bitwise_xor(low_byte(x), low_byte(y))
+    tmp *= 5
+    base[..., 1] += tmp
+    del tmp
+    p = np.multiply(x, y)
+    p >>= 5
+    np.add(base[..., 2], p, out=base[..., 2], casting="unsafe")
     ex = Image.Exif()
     ex[0x0112] = rng_choice(rng, [6, 8])
     ex[0x010E] = "prog444-highq " + ("Q" * rng.randint(200, 1000))
     im = Image.fromarray(base, "RGB")
     try:
-        im.save(
+        save_jpeg(
+            im,
             outp,
-            "JPEG",
             quality=rng.randint(95, 98),
             progressive=True,
             optimize=True,
@@ -541,9 +948,9 @@ def jpg_prog_444_highq_odd(img, outp, rng):
         )
     except OSError:
         try:
-            im.resize((max(513, w - 1), max(513, h - 1))).save(
+            save_jpeg(
+                im.resize((max(513, w - 1), max(513, h - 1))),
                 outp,
-                "JPEG",
                 quality=94,
                 progressive=True,
                 optimize=False,
@@ -553,9 +960,9 @@ def jpg_prog_444_highq_odd(img, outp, rng):
             )
         except OSError:
             # Final fallback: drop subsampling/metadata complexity but keep odd dims/patterns.
-            im.resize((max(513, w - 3), max(513, h - 3))).save(
+            save_jpeg(
+                im.resize((max(513, w - 3), max(513, h - 3))),
                 outp,
-                "JPEG",
                 quality=92,
                 progressive=False,
                 optimize=False,
@@ -565,30 +972,35 @@ def jpg_prog_444_highq_odd(img, outp, rng):
 def png_apng_glitch_chaos(img, outp, rng):
     del img
     w, h = rng_choice(rng, [(7, 9), (13, 11), (257, 1)])
-    frames = []
-    durations = []
     frame_count = rng_choice(rng, [120, 150, 200])
+    # Pixel noise comes from the per-file seed so the output is reproducible. Seed it
+    # from a copy of rng: a single-source run shares one rng across all items, and
+    # drawing from it here would change every later pick.
+    r = random.Random()
+    r.setstate(rng.getstate())
+    noise = np.random.default_rng(r.getrandbits(64))
+    # Per-frame choices are drawn up front, in their original order, because the
+    # animation settings drawn after them are needed before frame 0 is written.
+    plan = []
     for i in range(frame_count):
-        rgba = np.random.randint(0, 256, (h, w, 4), dtype=np.uint8)
         # Randomly make some frames almost entirely transparent to break simple heuristics
-        if i % rng_choice(rng, [7, 11]) == 0:
-            rgba[..., 3] = rng_choice(rng, [0, 1, 2])
-        frames.append(Image.fromarray(rgba, "RGBA"))
+        alpha = rng_choice(rng, [0, 1, 2]) if i % rng_choice(rng, [7, 11]) == 0 else None
         # Mix extremely quick frames with surprisingly long pauses
         if i % rng_choice(rng, [13, 17]) == 0:
-            durations.append(rng_choice(rng, [1000, 5000, 10000]))
+            plan.append((alpha, rng_choice(rng, [1000, 5000, 10000])))
         else:
-            durations.append(rng_choice(rng, [0, 1, 5, 10]))
-    frames[0].save(
+            plan.append((alpha, rng_choice(rng, [0, 1, 5, 10])))
+    with ApngWriter(
         outp,
-        "PNG",
-        save_all=True,
-        append_images=frames[1:],
-        duration=durations,
         loop=rng_choice(rng, [0, 1, 65535]),
         disposal=rng_choice(rng, [0, 1, 2]),
         blend=rng_choice(rng, [0, 1]),
-    )
+    ) as apng:
+        for alpha, duration in plan:
+            rgba = noise.integers(0, 256, (h, w, 4), dtype=np.uint8)
+            if alpha is not None:
+                rgba[..., 3] = alpha
+            apng.add(Image.fromarray(rgba, "RGBA"), duration)
 
 
 def png_cve_like_metadata(img, outp, rng):
@@ -608,9 +1020,9 @@ def png_cve_like_metadata(img, outp, rng):
         )
     # Weird transparency array mapping
     rgb.info["transparency"] = bytes([rng.randint(0, 255) for _ in range(256)])
-    rgb.save(
+    save_png(
+        rgb,
         outp,
-        "PNG",
         pnginfo=info,
         dpi=(rng_choice(rng, [0, 1, 10000, 4294967295]), rng_choice(rng, [0, 1, 10000, 4294967295])), # Extreme DPIs
         optimize=False,
@@ -627,9 +1039,9 @@ def jpg_extreme_exif_corruption(img, outp, rng):
     
     rgb = img.convert("RGB").resize((rng_choice(rng, [8, 16]), rng_choice(rng, [8, 16])))
     try:
-        rgb.save(
+        save_jpeg(
+            rgb,
             outp,
-            "JPEG",
             quality=rng.randint(1, 10), # Terribly low quality
             progressive=rng_choice(rng, [True, False]),
             optimize=False,
@@ -639,9 +1051,9 @@ def jpg_extreme_exif_corruption(img, outp, rng):
             subsampling=rng_choice(rng, [0, 1, 2]) # Try diff subsamplings
         )
     except OSError:
-        rgb.save(
+        save_jpeg(
+            rgb,
             outp,
-            "JPEG",
             quality=10,
             optimize=False,
         )
@@ -660,24 +1072,207 @@ def jpg_cmyk_extreme_aspect(img, outp, rng):
     # Just blank image to save generation time/memory for the script itself
     blank = Image.new("CMYK", (w, h), (0, 0, 0, 0))
     try:
-        blank.save(
+        save_jpeg(
+            blank,
             outp,
-            "JPEG",
             quality=80,
             progressive=True,
             optimize=False
         )
     except OSError:
         # Fallback if PIL refuses
-        blank.resize((min(w, 8192), min(h, 8192))).save(
+        save_jpeg(
+            blank.resize((min(w, 8192), min(h, 8192))),
             outp,
-            "JPEG",
             quality=80,
             progressive=False, # Non progressive if progressive fails
             optimize=False
         )
 
 
+def _mem(sizes, bytes_per_px, frames=1, extra=0):
+    return sizes, bytes_per_px, frames, extra
+
+
+# Peak working set of each generator: candidate canvas sizes (None = source
+# size), bytes per pixel per frame, frame count and fixed extra bytes.
+# APNGs stream through ApngWriter, which holds a few frames whatever the length.
+# Calibrated from ru_maxrss at each generator's largest size and rounded up;
+# estimates always use the largest candidate so they are safe for budgeting.
+MEMORY_PROFILES = {
+    "exif_orient": _mem(None, 12),
+    "prog_gray": _mem(None, 8),
+    "cmyk_prog": _mem(None, 16),
+    "png_palette_trns": _mem(None, 16),
+    "png_colorkey_meta": _mem(None, 24),
+    "png_gray16": _mem(None, 12),
+    "apng_preview": _mem([(320, 320)], 16, 4),
+    "png_apng_invisible_firstframe": _mem([(256, 256)], 16, 4),
+    "png_apng_tiny_burst": _mem([(31, 31)], 64, 4),
+    "png_palette_fulltrns_interlaced": _mem([(1536, 768)], 16),
+    "png_la_moire": _mem([(1024, 1024), (1600, 900), (2048, 1024)], 16),
+    "png_huge_dims_tiny_content": _mem([(8192, 32), (32, 8192)], 16),
+    "png_gray16_gradient_strip": _mem([(4096, 256), (8192, 8), (2048, 2048)], 4),
+    "png_apng_odd_canvas_stutter": _mem([(63, 35), (35, 63)], 64, 4),
+    "png_apng_alpha_blocks_irregular": _mem([(320, 240), (400, 300)], 12, 4),
+    "png_colorkey_meta_itxt_heavy": _mem([(1024, 768), (1400, 933), (1600, 1200)], 16),
+    "png_extreme_aspect_line": _mem([(65535, 1), (32767, 3), (16384, 7)], 16),
+    "png_palette_lowbit_trns": _mem([(1024, 1024), (1536, 512), (768, 768)], 8),
+    "png_apng_glitch_chaos": _mem([(257, 1), (13, 11)], 64, 4),
+    "png_cve_like_metadata": _mem([(128, 128)], 16, extra=24 << 20),
+    "jpg_exif_orient_comment_heavy": _mem([(1800, 1200)], 8),
+    "jpg_progressive_grayscale_odd": _mem([(2201, 1469), (2601, 1733), (3001, 1999)], 5),
+    "jpg_cmyk_progressive_odd_aspect": _mem([(1600, 700), (2200, 900), (2049, 341), (3073, 513)], 17),
+    "jpg_progressive_444_exif_comment": _mem([(1537, 1025), (1800, 1201), (2049, 1365)], 18),
+    "jpg_baseline_444_odd": _mem([(2200, 1400), (2400, 1600), (2048, 2048)], 16),
+    "jpg_cmyk_baseline_odd_aspect": _mem([(2049, 1025), (3073, 513), (1601, 901), (2201, 701)], 17),
+    "jpg_exif_mirror_orient_comment": _mem([(1801, 1201), (1600, 1067), (1401, 933)], 8),
+    "jpg_prog_gray_prime_comment": _mem([(3001, 2003), (4093, 3079), (2609, 1733)], 5),
+    "jpg_prog_444_highq_odd": _mem([(2100, 1337), (2200, 1463), (2401, 1601)], 20),
+    "jpg_extreme_exif_corruption": _mem([(16, 16)], 16, extra=1 << 20),
+    "jpg_cmyk_extreme_aspect": _mem([(65535, 2), (2, 65535)], 8),
+}
+
+# Encoder buffers, Python objects and allocator slack around every call.
+JOB_OVERHEAD = 16 << 20
+# Interpreter and NumPy/Pillow per worker, plus its own decoded source and
+# RGB/RGBA/L copies per source pixel (SHARED_BYTES_PER_PX once when shared).
+WORKER_OVERHEAD = 64 << 20
+SOURCE_BYTES_PER_PX = 12
+
+
+def estimate_peak_bytes(fn, src_size):
+    sizes, bpp, frames, extra = MEMORY_PROFILES[fn.__name__]
+    px = max(w * h for w, h in (sizes or [src_size]))
+    return px * bpp * frames + extra + JOB_OVERHEAD
+
+
+def parse_size(text):
+    """'512M', '4G', '1.5g' or plain bytes -> int; 'auto' -> available memory."""
+    if text == "auto":
+        return available_memory()
+    units = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+    t = text.strip().lower().rstrip("b")
+    if t and t[-1] in units:
+        return int(float(t[:-1]) * units[t[-1]])
+    return int(t)
+
+
+def available_memory():
+    # 80% of what is free right now, capped by the cgroup (container) limit.
+    avail = None
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    avail = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        with open("/sys/fs/cgroup/memory.max", encoding="ascii") as f:
+            limit = f.read().strip()
+        with open("/sys/fs/cgroup/memory.current", encoding="ascii") as f:
+            used = int(f.read())
+        if limit != "max":
+            room = int(limit) - used
+            avail = room if avail is None else min(avail, room)
+    except OSError:
+        pass
+    if avail is None:
+        return None
+    return int(avail * 0.8)
+
+
+def baseline_bytes(workers, src_px, shared=False):
+    # Memory held before any job runs: the workers plus their source copies,
+    # or a single shared copy when the parent published the source.
+    if shared:
+        return workers * WORKER_OVERHEAD + src_px * SHARED_BYTES_PER_PX
+    return workers * (WORKER_OVERHEAD + src_px * SOURCE_BYTES_PER_PX)
+
+
+def budget_workers(workers, budget, src_px, shared=False):
+    # Never start more workers than the budget can hold alongside their own baseline.
+    if budget is None:
+        return workers
+    if shared:
+        budget -= src_px * SHARED_BYTES_PER_PX
+        return max(1, min(workers, budget // (WORKER_OVERHEAD + JOB_OVERHEAD)))
+    per_worker = WORKER_OVERHEAD + src_px * SOURCE_BYTES_PER_PX + JOB_OVERHEAD
+    return max(1, min(workers, budget // per_worker))
+
+
+def worker_pids(pool):
+    # Pool has no public view of its processes; _pool has held them since 2.6.
+    return {p.pid for p in pool._pool}
+
+
+def run_budgeted(pool, func, jobs, costs, budget, workers, failed, lost=None, lookahead=32):
+    """Yield func(job) results, admitting jobs only while their summed cost fits.
+
+    A job larger than the whole budget still runs, but alone. When the next job
+    does not fit, up to ``lookahead`` later jobs are tried so small ones can
+    fill the gap without losing most of the submission order.
+
+    ``failed(job, message)`` builds the result yielded for a job that raised or
+    whose worker died. A killed worker (the OOM killer is the usual suspect)
+    never reports back and Pool silently replaces it, so replaced workers are
+    counted; once every job still in flight must be one of theirs, those jobs
+    are reported as lost instead of being waited on forever. Their indexes go
+    into the ``lost`` list if one is given: Pool still holds those tasks, so the
+    caller must end it with shutdown_pool(pool, lost) rather than close/join.
+    """
+    done = queue.Queue()
+    pending = list(range(len(jobs)))
+    in_flight = {}  # job index -> cost
+    pids = worker_pids(pool)
+    dead = 0  # workers replaced since their jobs were last accounted for
+    while pending or in_flight:
+        while pending and len(in_flight) < workers:
+            used = sum(in_flight.values())
+            pick = None
+            for k, j in enumerate(pending[:lookahead]):
+                if budget is None or not in_flight or used + costs[j] <= budget:
+                    pick = k
+                    break
+            if pick is None:
+                break
+            j = pending.pop(pick)
+            in_flight[j] = costs[j]
+            pool.apply_async(
+                func,
+                (jobs[j],),
+                callback=lambda r, j=j: done.put((j, r)),
+                error_callback=lambda e, j=j: done.put((j, failed(jobs[j], f"{type(e).__name__}: {e}"))),
+            )
+        try:
+            j, result = done.get(timeout=1.0)
+        except queue.Empty:
+            now = worker_pids(pool)
+            dead += len(pids - now)
+            pids = now
+            if dead and dead >= len(in_flight):
+                for j in sorted(in_flight):
+                    if lost is not None:
+                        lost.append(j)
+                    yield failed(jobs[j], "worker process died (out of memory?)")
+                in_flight.clear()
+                dead = 0
+            continue
+        if in_flight.pop(j, None) is not None:
+            yield result
+
+
+def shutdown_pool(pool, lost=None):
+    # join() waits for every task Pool still tracks, and a task lost with its
+    # worker never completes: terminate instead of hanging.
+    if lost:
+        pool.terminate()
+    else:
+        pool.close()
+        pool.join()
+
+
 def build_generators(formats, profile):
     gens = []
 
@@ -744,11 +1339,174 @@ def build_generators(formats, profile):
     return gens
 
 
+def generator_registry():
+    # name -> (fn, ext) for every generator reachable from any profile.
+    return {name: (fn, ext) for name, fn, ext in build_generators({"png", "jpg"}, "mixed")}
+
+
+SOURCE_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+
+# One decoded source per worker process; batch jobs arrive grouped by source.
+_worker_source = (None, None)
+# source path -> publish_source handle, for sources the parent shared.
+_shared_sources = {}
+
+
+def expand_inputs(specs):
+    """Resolve --input values (files, directories, globs, @listfile) to source paths."""
+    paths = []
+    for spec in specs:
+        if spec.startswith("@"):
+            with open(spec[1:], encoding="utf-8") as f:
+                paths += expand_inputs([line.strip() for line in f if line.strip() and not line.startswith("#")])
+        elif os.path.isdir(spec):
+            paths += sorted(
+                os.path.join(spec, f)
+                for f in os.listdir(spec)
+                if os.path.splitext(f)[1].lower() in SOURCE_EXTS
+            )
+        elif glob.has_magic(spec):
+            # "**" also matches directories and whatever else sits beside the sources.
+            paths += sorted(
+                p
+                for p in glob.glob(spec, recursive=True)
+                if os.path.splitext(p)[1].lower() in SOURCE_EXTS and os.path.isfile(p)
+            )
+        else:
+            paths.append(spec)
+    return paths
+
+
+def probe_sources(sources):
+    """Return {path: size} for the sources Pillow can open, reporting the rest.
+
+    Only headers are read. One unreadable file in a directory of seed photos is
+    reported and skipped rather than ending the whole batch.
+    """
+    sizes = {}
+    for src in sources:
+        try:
+            with Image.open(src) as im:
+                sizes[src] = im.size
+        except Exception as e:
+            print("ERR", src, e)
+    return sizes
+
+
+def shard_dirs(out, sources):
+    # out/<source stem>, disambiguated when two sources share a stem.
+    seen = {}
+    dirs = []
+    for path in sources:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        n = seen.get(stem, 0)
+        seen[stem] = n + 1
+        dirs.append(os.path.join(out, stem if n == 0 else f"{stem}_{n}"))
+    return dirs
+
+
+def plan_batch(sources, out, gens, count, seed):
+    # Item i of every source uses seed+i for both the generator pick and the
+    # generator itself, so any output can be rebuilt from (source, name, seed).
+    jobs = []
+    for src, shard in zip(sources, shard_dirs(out, sources)):
+        ensure_dir(shard)
+        for i in range(count):
+            rng = random.Random(seed + i)
+            name, fn, ext = rng_choice(rng, gens)
+            jobs.append((src, os.path.join(shard, f"{i:03d}_{name}.{ext}"), fn, seed + i))
+    return jobs
+
+
+def init_batch_worker(encode_speed, shared=None):
+    global _shared_sources
+    set_encode_speed(encode_speed)
+    _shared_sources = shared or {}
+
+
+def open_batch_source(src):
+    handle = _shared_sources.get(src)
+    return SharedSource(handle) if handle else CachedSource(Image.open(src))
+
+
+def run_batch_job(job):
+    global _worker_source
+    src, outp, fn, seed = job
+    if _worker_source[0] != src:
+        prev = _worker_source[1]
+        _worker_source = (None, None)  # drop the previous source before decoding the next
+        if isinstance(prev, SharedSource):
+            prev.close()
+        _worker_source = (src, open_batch_source(src))
+    try:
+        fn(_worker_source[1], outp, random.Random(seed))
+        return outp, None
+    except Exception as e:
+        return outp, str(e)
+
+
+def run_batch(jobs, workers, encode_speed, sources, sizes, budget=None):
+    max_px = max(w * h for w, h in sizes.values())
+    # With fewer sources than about two per worker, several workers end up on
+    # the same source: decode each once here and let them all map it.
+    share = workers > 1 and len(sources) < workers * 2
+    src_px = sum(w * h for w, h in sizes.values()) if share else max_px
+    workers = budget_workers(workers, budget, src_px, share)
+    share = share and workers > 1
+    published = {}
+    lost = []
+    if workers <= 1:
+        init_batch_worker(encode_speed)
+        results = map(run_batch_job, jobs)
+        pool = None
+    else:
+        for src in sources if share else ():
+            with Image.open(src) as im:
+                published[src] = publish_source(im)
+        initargs = (encode_speed, {src: handle for src, (_shm, handle) in published.items()})
+        pool = mp.Pool(workers, initializer=init_batch_worker, initargs=initargs)
+    if pool is not None and budget is not None:
+        job_budget = budget - baseline_bytes(workers, src_px, share)
+        costs = [estimate_peak_bytes(fn, sizes[src]) for src, _outp, fn, _seed in jobs]
+        results = run_budgeted(
+            pool, run_batch_job, jobs, costs, max(0, job_budget), workers, lambda job, e: (job[1], e), lost
+        )
+    elif pool is not None:
+        # With enough sources, one chunk is one source, decoded once by one worker.
+        # Otherwise split sources across workers, which map the published copies.
+        per_source = len(jobs) // len(sources)
+        if len(sources) >= workers * 2:
+            chunksize = max(1, per_source)  # --count 0 leaves no jobs
+        else:
+            chunksize = max(1, len(jobs) // (workers * 4))
+        results = pool.imap_unordered(run_batch_job, jobs, chunksize=chunksize)
+    ok = err = 0
+    try:
+        for outp, e in results:
+            if e is None:
+                print("OK", outp)
+                ok += 1
+            else:
+                print("ERR", outp, e)
+                err += 1
+    finally:
+        if pool is not None:
+            shutdown_pool(pool, lost)
+        for shm, _handle in published.values():
+            release_source(shm)
+    print(f"Done: {ok} ok, {err} err from {len(sources)} sources")
+
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True)
+    ap.add_argument(
+        "--input",
+        required=True,
+        nargs="+",
+        help="Source image(s): files, directories, globs or @listfile. Anything but a single file runs in batch mode",
+    )
     ap.add_argument("--out", required=True)
-    ap.add_argument("--count", type=int, default=20)
+    ap.add_argument("--count", type=int, default=20, help="Outputs per source")
     ap.add_argument("--formats", nargs="*", default=["png", "jpg"])
     ap.add_argument(
         "--profile",
@@ -757,16 +1515,44 @@ def main():
         help="classic=original set, weird=stronger valid edge cases, weirder=pushes further, strangest=extreme mutations, mixed=all",
     )
     ap.add_argument("--seed", type=int, default=1337)
+    ap.add_argument(
+        "--encode-speed",
+        choices=sorted(ENCODE_SPEEDS),
+        default="default",
+        help="Encoder effort: default=Pillow defaults, fastest/fast=cheaper entropy coding, small=max zlib effort",
+    )
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (batch mode only)")
+    ap.add_argument(
+        "--memory-budget",
+        help="Cap on estimated peak memory across workers, e.g. 4G or 'auto' (batch mode only)",
+    )
     args = ap.parse_args()
 
+    set_encode_speed(args.encode_speed)
     ensure_dir(args.out)
-    img = Image.open(args.input)
-    rng = random.Random(args.seed)
 
     gens = build_generators(set(args.formats), args.profile)
     if not gens:
         raise SystemExit("No generators selected. Check --formats and --profile.")
 
+    single = len(args.input) == 1 and os.path.isfile(args.input[0]) and not args.input[0].startswith("@")
+    if not single:
+        sources = expand_inputs(args.input)
+        if not sources:
+            raise SystemExit("No source images matched --input.")
+        # Probe before planning so unreadable files get no shard directory.
+        sizes = probe_sources(sources)
+        sources = [src for src in sources if src in sizes]
+        if not sources:
+            raise SystemExit("None of the source images matched by --input could be opened.")
+        budget = parse_size(args.memory_budget) if args.memory_budget else None
+        jobs = plan_batch(sources, args.out, gens, args.count, args.seed)
+        run_batch(jobs, args.workers, args.encode_speed, sources, sizes, budget)
+        return
+
+    img = CachedSource(Image.open(args.input[0]))
+    rng = random.Random(args.seed)
+
     for i in range(args.count):
         name, fn, ext = rng_choice(rng, gens)
         outp = os.path.join(args.out, f"{i:03d}_{name}.{ext}")
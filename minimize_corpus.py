@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import argparse
+import importlib
+import io
+import json
+import os
+import random
+import sys
+
+from PIL import Image, ImageOps, ImageSequence
+
+import image_mutator_local as mut
+
+
+def pillow_decode(data):
+    frames = 0
+    with Image.open(io.BytesIO(data)) as im:
+        im.getexif()
+        for frame in ImageSequence.Iterator(im):
+            frame.load()
+            frames += 1
+        ImageOps.exif_transpose(im)
+    return frames
+
+
+def load_target(spec):
+    # "package.module:function" -> callable taking the file bytes.
+    mod_name, _, fn_name = spec.partition(":")
+    return getattr(importlib.import_module(mod_name), fn_name or "decode")
+
+
+class LineTracer:
+    """Collect (filename, line) pairs executed in files under ``prefixes``.
+
+    Uses sys.monitoring where available (3.12+) so each location costs one
+    callback per candidate; falls back to sys.settrace on older interpreters.
+    """
+
+    TOOL_ID = 3
+
+    def __init__(self, prefixes):
+        self.prefixes = tuple(os.path.abspath(p) for p in prefixes)
+        self.hits = set()
+        self.wanted = {}
+        self.monitoring = getattr(sys, "monitoring", None)
+
+    def _wanted(self, filename):
+        ok = self.wanted.get(filename)
+        if ok is None:
+            ok = self.wanted[filename] = os.path.abspath(filename).startswith(self.prefixes)
+        return ok
+
+    def _on_line(self, code, line):
+        if self._wanted(code.co_filename):
+            self.hits.add((code.co_filename, line))
+        return self.monitoring.DISABLE
+
+    def _trace(self, frame, event, arg):
+        if not self._wanted(frame.f_code.co_filename):
+            return None
+        if event == "line":
+            self.hits.add((frame.f_code.co_filename, frame.f_lineno))
+        return self._trace
+
+    def run(self, fn, *args):
+        self.hits = set()
+        mon = self.monitoring
+        if mon is not None:
+            mon.use_tool_id(self.TOOL_ID, "minimize_corpus")
+            mon.register_callback(self.TOOL_ID, mon.events.LINE, self._on_line)
+            mon.set_events(self.TOOL_ID, mon.events.LINE)
+            mon.restart_events()
+        else:
+            sys.settrace(self._trace)
+        try:
+            fn(*args)
+            exc = None
+        except Exception as e:
+            exc = type(e).__name__
+        finally:
+            if mon is not None:
+                mon.set_events(self.TOOL_ID, 0)
+                mon.free_tool_id(self.TOOL_ID)
+            else:
+                sys.settrace(None)
+        if exc is not None:
+            # Distinct failure modes are worth keeping even if the lines overlap.
+            self.hits.add(("<exception>", exc))
+        return frozenset(self.hits)
+
+
+def greedy_cover(candidates):
+    """Pick candidates until the union of their coverage is reached.
+
+    Each round takes the candidate adding the most uncovered features, breaking
+    ties by smaller output size so the resulting pack stays cheap to replay.
+    """
+    remaining = set().union(*(c["features"] for c in candidates)) if candidates else set()
+    chosen = []
+    pool = list(candidates)
+    while remaining:
+        best = max(pool, key=lambda c: (len(c["features"] & remaining), -c["size"]))
+        gain = best["features"] & remaining
+        if not gain:
+            break
+        chosen.append(best)
+        remaining -= gain
+        pool.remove(best)
+    return chosen
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pick the smallest (generator, seed) set reaching the same decoder coverage")
+    ap.add_argument("--input", required=True, help="Seed image path used for derived variants")
+    ap.add_argument("--profile", default="mixed", choices=["classic", "weird", "weirder", "strangest", "mixed"])
+    ap.add_argument("--formats", nargs="*", default=["png", "jpg"])
+    ap.add_argument("--seeds", type=int, default=8, help="Seeds tried per generator")
+    ap.add_argument("--seed-base", type=int, default=5000, help="First seed tried for each generator")
+    ap.add_argument("--target", help="Decoder as module:function taking bytes (default: Pillow open/load/seek)")
+    ap.add_argument(
+        "--trace",
+        nargs="*",
+        help="Source directories whose lines count as coverage (default: the Pillow package)",
+    )
+    ap.add_argument("--out", default="minimized_pack.json", help="Pack definition written here")
+    ap.add_argument("--encode-speed", choices=sorted(mut.ENCODE_SPEEDS), default="default")
+    args = ap.parse_args()
+
+    mut.set_encode_speed(args.encode_speed)
+    img = mut.CachedSource(Image.open(args.input))
+    target = load_target(args.target) if args.target else pillow_decode
+    trace = args.trace or [os.path.dirname(Image.__file__)]
+    if args.target and not args.trace:
+        trace.append(os.path.dirname(os.path.abspath(sys.modules[target.__module__].__file__)))
+    tracer = LineTracer(trace)
+
+    candidates = []
+    for name, fn, ext in mut.build_generators(set(args.formats), args.profile):
+        for seed in range(args.seed_base, args.seed_base + args.seeds):
+            buf = io.BytesIO()
+            try:
+                fn(img, buf, random.Random(seed))
+            except Exception as e:
+                print("ERR", name, seed, e)
+                continue
+            data = buf.getvalue()
+            features = tracer.run(target, data)
+            candidates.append({"generator": name, "seed": seed, "ext": ext, "size": len(data), "features": features})
+            print("OK ", name, seed, len(features))
+
+    chosen = greedy_cover(candidates)
+    total = len(set().union(*(c["features"] for c in candidates))) if candidates else 0
+    entries = [
+        {"file": f"{i:02d}_{c['generator']}_{c['seed']}.{c['ext']}", "generator": c["generator"], "seed": c["seed"]}
+        for i, c in enumerate(chosen, 1)
+    ]
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"name": os.path.splitext(os.path.basename(args.out))[0], "files": entries}, f, indent=2)
+        f.write("\n")
+    print(f"Done: {len(chosen)} of {len(candidates)} inputs cover all {total} features -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
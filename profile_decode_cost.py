@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import shlex
+import subprocess
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: latency and frames only
+    resource = None
+
+import image_mutator_local as mut
+from minimize_corpus import load_target, pillow_decode
+
+
+def to_kb(maxrss):
+    # Linux reports KiB, macOS bytes.
+    return maxrss // 1024 if os.uname().sysname == "Darwin" else maxrss
+
+
+def peak_rss_kb(who):
+    if resource is None:
+        return None
+    return to_kb(resource.getrusage(who).ru_maxrss)
+
+
+def decode_in_child(job):
+    # Runs in a fresh worker (maxtasksperchild=1) so ru_maxrss is this file's peak.
+    path, target = job
+    decode = load_target(target) if target else pillow_decode
+    with open(path, "rb") as f:
+        data = f.read()
+    base = peak_rss_kb(resource.RUSAGE_SELF) if resource else None
+    t0 = time.perf_counter()
+    frames = None
+    exc = ""
+    try:
+        frames = decode(data)
+    except Exception as e:
+        exc = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - t0
+    peak = peak_rss_kb(resource.RUSAGE_SELF) if resource else None
+    mem = None if base is None else peak - base
+    return {"seconds": elapsed, "peak_kb": mem, "frames": frames, "error": exc}
+
+
+def decode_with_command(path, template):
+    cmd = [a.replace("{}", path) for a in shlex.split(template)]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = proc.stderr.read()
+    proc.stderr.close()
+    peak = None
+    if hasattr(os, "wait4"):
+        # Reap it ourselves: wait4 returns this child's own peak RSS, where
+        # RUSAGE_CHILDREN would only report the max over every child so far.
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        peak = to_kb(usage.ru_maxrss)
+    else:
+        proc.wait()
+    elapsed = time.perf_counter() - t0
+    err = "" if proc.returncode == 0 else f"exit {proc.returncode}: {stderr.decode(errors='replace').strip()[:200]}"
+    return {"seconds": elapsed, "peak_kb": peak, "frames": None, "error": err}
+
+
+def generator_for(fname, names):
+    # Longest registered generator name contained in the file name wins, which
+    # covers "001_<name>.ext", pack names and "_alt"/seed suffixes alike.
+    stem = os.path.splitext(fname)[0]
+    hits = [n for n in names if n in stem]
+    return max(hits, key=len) if hits else "?"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure decode cost of every generated file and rank generators")
+    ap.add_argument("dir", help="Directory of generated files (searched recursively)")
+    ap.add_argument(
+        "--decoder",
+        action="append",
+        default=[],
+        metavar="LABEL=module:function",
+        help="Extra Python decoder taking bytes; repeatable. Pillow is always measured.",
+    )
+    ap.add_argument(
+        "--command",
+        action="append",
+        default=[],
+        metavar="LABEL=CMD",
+        help="External decoder command, {} replaced by the file path (e.g. 'djpeg=djpeg -outfile /dev/null {}')",
+    )
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per file; the fastest is kept")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--csv", help="Write per-file measurements here")
+    args = ap.parse_args()
+
+    # Packs nest their files (e.g. <out>/<pack>/<file>), so walk the whole tree.
+    files = sorted(os.path.join(root, f) for root, _, fs in os.walk(args.dir) for f in fs)
+    names = list(mut.generator_registry())
+    decoders = [("pillow", None)] + [tuple(d.split("=", 1)) for d in args.decoder]
+    commands = [tuple(c.split("=", 1)) for c in args.command]
+
+    rows = []
+    with mp.Pool(args.workers, maxtasksperchild=1) as pool:
+        for label, target in decoders:
+            jobs = [(p, target) for p in files for _ in range(args.repeat)]
+            results = pool.map(decode_in_child, jobs, chunksize=1)
+            for i, p in enumerate(files):
+                runs = results[i * args.repeat : (i + 1) * args.repeat]
+                rows.append((label, p, min(runs, key=lambda r: r["seconds"])))
+    for label, template in commands:
+        for p in files:
+            runs = [decode_with_command(p, template) for _ in range(args.repeat)]
+            rows.append((label, p, min(runs, key=lambda r: r["seconds"])))
+
+    table = []
+    for label, p, r in rows:
+        size = os.path.getsize(p)
+        fname = os.path.relpath(p, args.dir)
+        table.append(
+            {
+                "decoder": label,
+                "file": fname,
+                "generator": generator_for(os.path.basename(p), names),
+                "bytes": size,
+                "seconds": r["seconds"],
+                "peak_kb": r["peak_kb"],
+                "frames": r["frames"],
+                "error": r["error"],
+            }
+        )
+        print(
+            f"{'ERR' if r['error'] else 'OK '} {label:8s} {fname:48s} {size:>10d}B {r['seconds'] * 1000:9.2f}ms "
+            f"{'' if r['peak_kb'] is None else r['peak_kb']:>8}KB {'' if r['frames'] is None else r['frames']:>4} {r['error']}"
+        )
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(table[0]) if table else ["decoder"])
+            w.writeheader()
+            w.writerows(table)
+
+    print()
+    print("Generators by decoder cost per output byte (ns/B, KB peak per KB file):")
+    for label, _ in decoders + commands:
+        agg = {}
+        for t in table:
+            if t["decoder"] != label:
+                continue
+            a = agg.setdefault(t["generator"], [0.0, 0, 0, 0])
+            a[0] += t["seconds"]
+            a[1] += t["bytes"]
+            a[2] = max(a[2], t["peak_kb"] or 0)
+            a[3] += bool(t["error"])
+        ranked = sorted(agg.items(), key=lambda kv: kv[1][0] / max(1, kv[1][1]), reverse=True)
+        print(f"[{label}]")
+        for gen, (secs, size, peak, errs) in ranked:
+            print(
+                f"  {gen:34s} {secs * 1e9 / max(1, size):10.1f} ns/B  "
+                f"{peak / max(1, size / 1024):8.1f}x mem  {errs} err"
+            )
+
+
+if __name__ == "__main__":
+    main()
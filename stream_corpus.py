@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+import argparse
+import io
+import os
+import queue
+import random
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+from PIL import Image
+
+import image_mutator_local as mut
+
+
+# Wire protocol (all integers big-endian), one request -> at most one reply:
+#   client -> server   b"N"                          next input
+#                      b"F" + u16 len + name         generator `name` found new coverage
+#                      b"Q"                          close the stream
+#   server -> client   u64 seed + u16 name len + u32 data len + name + data
+# The harness pulls at its own pace, so a slow decoder naturally throttles the
+# generator; --prefetch only bounds how far ahead the producer may run.
+FRAME_HEAD = struct.Struct(">QHI")
+NAME_LEN = struct.Struct(">H")
+
+
+class CorpusStream:
+    """Endless, seed-indexed stream of (name, seed, bytes) from registered generators.
+
+    Item ``i`` is built with ``random.Random(seed + i)``, so any (name, seed)
+    pair can be regenerated on its own. Generator choice is weighted; calling
+    ``reward(name)`` boosts a generator and the boost decays geometrically as
+    further items are drawn.
+    """
+
+    def __init__(self, img, gens, seed=0, boost=4.0, decay=0.98, prefetch=0):
+        self.img = img
+        self.gens = list(gens)
+        self.by_name = {name: (fn, ext) for name, fn, ext in self.gens}
+        self.next_seed = seed
+        self.pick_rng = random.Random(seed)
+        self.boost = boost
+        self.decay = decay
+        self.bonus = {name: 0.0 for name, _fn, _ext in self.gens}
+        self.lock = threading.Lock()
+        self.queue = None
+        self.producer = None
+        self.closed = False
+        if prefetch > 0:
+            self.queue = queue.Queue(maxsize=prefetch)
+            self.producer = threading.Thread(target=self._produce, daemon=True)
+            self.producer.start()
+
+    def reward(self, name):
+        with self.lock:
+            if name in self.bonus:
+                self.bonus[name] += self.boost
+
+    def _pick(self):
+        with self.lock:
+            names = list(self.bonus)
+            weights = [1.0 + self.bonus[n] for n in names]
+            name = self.pick_rng.choices(names, weights)[0]
+            for n in names:
+                self.bonus[n] *= self.decay
+            item_seed = self.next_seed
+            self.next_seed += 1
+        return name, item_seed
+
+    def build(self, name, seed):
+        fn, _ext = self.by_name[name]
+        buf = io.BytesIO()
+        fn(self.img, buf, random.Random(seed))
+        return buf.getvalue()
+
+    def _next_item(self):
+        while True:
+            name, seed = self._pick()
+            try:
+                return name, seed, self.build(name, seed)
+            except Exception as e:
+                print("ERR", name, seed, e, file=sys.stderr)
+
+    def _produce(self):
+        while not self.closed:
+            item = self._next_item()
+            # A full queue blocks put(); wake up now and then so close() is noticed.
+            while not self.closed:
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        if self.queue is not None:
+            return self.queue.get()
+        return self._next_item()
+
+    def close(self):
+        self.closed = True
+        if self.producer is not None:
+            self.producer.join()
+            self.producer = None
+
+
+def write_frame(fp, name, seed, data):
+    raw = name.encode("utf-8")
+    fp.write(FRAME_HEAD.pack(seed, len(raw), len(data)))
+    fp.write(raw)
+    fp.write(data)
+    fp.flush()
+
+
+def read_exact(fp, n):
+    buf = fp.read(n)
+    if len(buf) != n:
+        raise EOFError("stream closed")
+    return buf
+
+
+def read_frame(fp):
+    seed, name_len, data_len = FRAME_HEAD.unpack(read_exact(fp, FRAME_HEAD.size))
+    name = read_exact(fp, name_len).decode("utf-8")
+    return name, seed, read_exact(fp, data_len)
+
+
+def request_next(fp):
+    fp.write(b"N")
+    fp.flush()
+
+
+def send_reward(fp, name):
+    raw = name.encode("utf-8")
+    fp.write(b"F" + NAME_LEN.pack(len(raw)) + raw)
+    fp.flush()
+
+
+def serve(stream, rfile, wfile):
+    while True:
+        op = rfile.read(1)
+        if not op or op == b"Q":
+            return
+        if op == b"N":
+            name, seed, data = next(stream)
+            write_frame(wfile, name, seed, data)
+        elif op == b"F":
+            (n,) = NAME_LEN.unpack(read_exact(rfile, NAME_LEN.size))
+            stream.reward(read_exact(rfile, n).decode("utf-8"))
+        else:
+            raise ValueError(f"unknown opcode {op!r}")
+
+
+def serve_unix(stream, path):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                serve(stream, self.rfile, self.wfile)
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                pass
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX) as probe:
+            try:
+                probe.connect(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(path)  # stale socket from a server that was killed
+            else:
+                raise SystemExit(f"a server is already listening on {path}")
+    with Server(path, Handler) as srv:
+        try:
+            print("Listening on", path, file=sys.stderr)
+            srv.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def connect_unix(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    return sock.makefile("rwb")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream generated inputs to an in-process fuzzing harness")
+    ap.add_argument("--input", required=True, help="Seed image path used for derived variants")
+    ap.add_argument("--formats", nargs="*", default=["png", "jpg"])
+    ap.add_argument(
+        "--profile",
+        choices=["classic", "weird", "weirder", "strangest", "mixed"],
+        default="mixed",
+    )
+    ap.add_argument("--seed", type=int, default=1337, help="Seed of the first item; item i uses seed+i")
+    ap.add_argument("--prefetch", type=int, default=4, help="Max items generated ahead of the harness (0=on demand)")
+    ap.add_argument("--boost", type=float, default=4.0, help="Weight added to a generator on F(ound coverage)")
+    ap.add_argument("--decay", type=float, default=0.98, help="Per-item decay of coverage boosts")
+    ap.add_argument("--socket", help="Serve on this Unix socket path instead of stdin/stdout")
+    ap.add_argument("--encode-speed", choices=sorted(mut.ENCODE_SPEEDS), default="default")
+    args = ap.parse_args()
+
+    mut.set_encode_speed(args.encode_speed)
+    img = mut.CachedSource(Image.open(args.input))
+    gens = mut.build_generators(set(args.formats), args.profile)
+    if not gens:
+        raise SystemExit("No generators selected. Check --formats and --profile.")
+
+    stream = CorpusStream(img, gens, args.seed, args.boost, args.decay, args.prefetch)
+    try:
+        if args.socket:
+            serve_unix(stream, args.socket)
+        else:
+            serve(stream, sys.stdin.buffer, sys.stdout.buffer)
+    finally:
+        stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+
+# Warm interpreter for repeated short pack-builder / intake runs:
+#   python warm_daemon.py serve &
+#   python warm_daemon.py run build_best20_weird_pack.py --input source.jpg --out packs/best20
+# `serve` imports Pillow, NumPy and the scripts once. `run` sends its argv, working
+# directory and stdin/stdout/stderr to the daemon, which forks a child that runs the
+# script's main() with them: warm imports, but still a fresh process per run (own
+# globals, own worker pool). The child keeps the daemon's environment. With no daemon
+# listening, `run` execs the script normally. The client only needs the stdlib modules
+# above, so it starts about as fast as `python -c pass`.
+#
+# Request: u32 length + JSON {"script", "argv", "cwd"}, fds 0-2 attached to the length.
+# Reply:   u32 exit status once the run is done.
+
+# Scripts the daemon will run, by file name.
+SCRIPTS = (
+    "build_pack",
+    "build_best20_weird_pack",
+    "build_best24_weirder_pack",
+    "harden_image_intake_example",
+)
+LENGTH = struct.Struct(">I")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_socket():
+    return os.environ.get("WEIRD_WARM_SOCKET") or os.path.join(
+        os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"weird-warm-{os.getuid()}.sock"
+    )
+
+
+def script_name(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name not in SCRIPTS:
+        raise SystemExit(f"not a warm-runnable script: {path} (one of {', '.join(SCRIPTS)})")
+    return name
+
+
+def recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise EOFError("connection closed")
+        buf += part
+    return buf
+
+
+def run_child(modules, conn, fds, req):
+    # In the forked child: become the client's process and run its script.
+    code = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdout.reconfigure(line_buffering=True)
+        os.chdir(req["cwd"])
+        name = req["script"]
+        sys.argv = [name + ".py"] + req["argv"]
+        try:
+            modules[name].main()
+            code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(LENGTH.pack(code & 0xFF))
+        finally:
+            os._exit(code & 0xFF)
+
+
+def serve(path):
+    import importlib
+
+    sys.path.insert(0, HERE)
+    modules = {name: importlib.import_module(name) for name in SCRIPTS}
+    # Pay up front, once, for what the scripts import lazily.
+    mut = modules["build_pack"].mut
+    mut.np.zeros(1)
+    importlib.import_module("multiprocessing.pool")
+    mut.generator_registry()
+
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX) as probe:
+            try:
+                probe.connect(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(path)  # stale socket from a daemon that died
+            else:
+                raise SystemExit(f"a daemon is already listening on {path}")
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old = os.umask(0o077)
+    try:
+        srv.bind(path)
+    finally:
+        os.umask(old)
+    srv.listen(16)
+    print("Listening on", path, file=sys.stderr)
+    try:
+        while True:
+            conn, _ = srv.accept()
+            # Reap finished children without blocking.
+            try:
+                while os.waitpid(-1, os.WNOHANG)[0]:
+                    pass
+            except ChildProcessError:
+                pass
+            try:
+                head, fds, _flags, _addr = socket.recv_fds(conn, LENGTH.size, 3)
+                if len(head) < LENGTH.size:
+                    head += recv_exact(conn, LENGTH.size - len(head))
+                req = json.loads(recv_exact(conn, LENGTH.unpack(head)[0]))
+                req["script"] = script_name(req["script"])
+            except (EOFError, ValueError, OSError, SystemExit) as e:
+                print("ERR bad request:", e, file=sys.stderr)
+                conn.close()
+                continue
+            if os.fork() == 0:
+                srv.close()
+                run_child(modules, conn, fds, req)
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+    finally:
+        srv.close()
+        os.remove(path)
+
+
+def run(path, script, argv):
+    name = script_name(script)
+    req = json.dumps({"script": script, "argv": argv, "cwd": os.getcwd()}).encode("utf-8")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # No daemon: a normal cold run.
+        target = script if os.path.exists(script) else os.path.join(HERE, name + ".py")
+        os.execv(sys.executable, [sys.executable, target] + argv)
+    socket.send_fds(sock, [LENGTH.pack(len(req))], [0, 1, 2])
+    sock.sendall(req)
+    try:
+        (code,) = LENGTH.unpack(recv_exact(sock, LENGTH.size))
+    except EOFError:
+        print("warm daemon: run ended without an exit status", file=sys.stderr)
+        code = 1
+    return code
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Warm interpreter for repeated pack builds and intake runs")
+    ap.add_argument("--socket", default=default_socket(), help="Unix socket path (env WEIRD_WARM_SOCKET)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="Import everything once and serve runs")
+    r = sub.add_parser("run", help="Run a script through the daemon (or cold if none is running)")
+    r.add_argument("script", help=", ".join(SCRIPTS))
+    r.add_argument("args", nargs=argparse.REMAINDER)
+    args = ap.parse_args()
+    if args.command == "serve":
+        serve(args.socket)
+    else:
+        raise SystemExit(run(args.socket, args.script, args.args))
+
+
+if __name__ == "__main__":
+    main()